@@ -0,0 +1,100 @@
+"""
+Requests/sec of utils.browser.Browser with and without the session pool.
+
+Runs against a local keep-alive HTTP stand-in. Every new connection is delayed by --connect-delay
+to stand in for the TLS handshake and proxy CONNECT round-trips of a real endpoint:
+
+    python -m benchmarks.bench_browser_pool --requests 300 --concurrency 10 --connect-delay 0.15
+"""
+
+import argparse
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import perf_counter
+
+from libs.baseAsyncSession import BaseAsyncSession
+from utils.browser import Browser, SessionPool
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connect_delay = 0.0
+
+    def setup(self):
+        super().setup()
+        time.sleep(self.connect_delay)
+
+    def do_GET(self):
+        body = b'{"asks": [["150.00", "1.0"]]}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stand_in(connect_delay: float) -> ThreadingHTTPServer:
+    StandInHandler.connect_delay = connect_delay
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def run_unpooled(url: str, requests: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            session = BaseAsyncSession()
+            try:
+                await session.get(url=url)
+            finally:
+                await session.close()
+
+    started = perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return requests / (perf_counter() - started)
+
+
+async def run_pooled(url: str, requests: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+    pool = SessionPool()
+
+    async def one(browser: Browser):
+        async with semaphore:
+            await browser.get(url=url)
+
+    started = perf_counter()
+    async with Browser(pool=pool) as browser:
+        await asyncio.gather(*(one(browser) for _ in range(requests)))
+    return requests / (perf_counter() - started)
+
+
+async def main(requests: int, concurrency: int, connect_delay: float):
+    server = start_stand_in(connect_delay)
+    url = f"http://127.0.0.1:{server.server_address[1]}/api/v3/depth"
+
+    try:
+        unpooled = await run_unpooled(url, requests, concurrency)
+        pooled = await run_pooled(url, requests, concurrency)
+    finally:
+        server.shutdown()
+
+    print(f"requests: {requests} | concurrency: {concurrency} | connect delay: {connect_delay * 1000:.0f} ms")
+    print(f"new session per request: {unpooled:8.1f} req/s")
+    print(f"pooled session:          {pooled:8.1f} req/s ({pooled / unpooled:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--connect-delay", type=float, default=0.15)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.requests, args.concurrency, args.connect_delay))
@@ -0,0 +1,71 @@
+"""
+Per-wallet cost of building a Client for a db wallet, by private key format, with and without the keypair cache.
+
+Keys are encrypted with a throwaway password, nothing is read from or written to the wallets database:
+
+    python -m benchmarks.bench_keypairs --wallets 2000 --cycles 3
+"""
+
+import argparse
+import json
+from time import perf_counter
+
+from cryptography.fernet import Fernet
+from solders.keypair import Keypair
+
+from data.settings import Settings
+from libs.sol_async_py.client import Client
+from libs.sol_async_py.data.models import Networks
+from libs.sol_async_py.keypairs import KeypairCache
+from utils.encryption import prk_encrypt, set_cipher_key
+from utils.key_vault import key_vault
+
+
+def build_clients(keys: list[str], cache: KeypairCache | None) -> float:
+    """Microseconds per Client, one pass over all wallets like a cycle of an action that starts with an empty key vault."""
+    key_vault.clear()
+    started = perf_counter()
+    for wallet_id, private_key in enumerate(keys, start=1):
+        if cache is None:
+            Client(private_key=private_key, network=Networks.Solana)
+        else:
+            Client(private_key=private_key, network=Networks.Solana, wallet_id=wallet_id)
+    return (perf_counter() - started) / len(keys) * 1e6
+
+
+def main(wallets: int, cycles: int):
+    set_cipher_key(Fernet.generate_key())
+    keypairs = [Keypair() for _ in range(wallets)]
+
+    formats = {
+        "base58": [str(keypair) for keypair in keypairs],
+        "byte array": [json.dumps(list(bytes(keypair))) for keypair in keypairs],
+    }
+    if Settings().private_key_encryption:
+        formats["encrypted base58"] = [prk_encrypt(key) for key in formats["base58"]]
+        formats["encrypted byte array"] = [prk_encrypt(key) for key in formats["byte array"]]
+    else:
+        print("private_key_encryption is off in settings.yaml, encrypted keys are skipped")
+
+    print(f"{wallets} wallets, {cycles} cycles, microseconds per Client")
+    print(f"{'key format':<22} {'no cache':>10} {'first cycle':>12} {'next cycles':>12} {'speedup':>8}")
+
+    for name, keys in formats.items():
+        uncached = min(build_clients(keys, None) for _ in range(cycles))
+
+        cache = KeypairCache()
+        first = build_clients(keys, cache)
+        cached = min(build_clients(keys, cache) for _ in range(cycles))
+
+        print(f"{name:<22} {uncached:10.1f} {first:12.1f} {cached:12.1f} {uncached / cached:7.1f}x")
+
+    key_vault.clear()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--wallets", type=int, default=2000)
+    parser.add_argument("--cycles", type=int, default=3)
+    args = parser.parse_args()
+
+    main(args.wallets, args.cycles)
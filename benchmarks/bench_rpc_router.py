@@ -0,0 +1,142 @@
+"""
+Read latency and send fan-out of libs.sol_async_py.rpc_router.RoutedProvider against a single endpoint.
+
+Runs against local JSON-RPC stand-ins: a fast endpoint that stalls on a share of requests,
+a steady but slower one and one that answers 429 on a share of requests:
+
+    python -m benchmarks.bench_rpc_router --requests 300 --concurrency 10 --stall 1.0 --stall-rate 0.1
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import perf_counter
+
+from solders.rpc.requests import GetBlockHeight, SendRawTransaction
+from solders.rpc.responses import GetBlockHeightResp
+
+from libs.sol_async_py.rpc_router import RateLimitedProvider, RoutedProvider, RpcRouter
+from utils.rate_limiter import rate_limiter
+
+
+def stand_in_handler(latency: float, stall: float, stall_rate: float, error_rate: float, counter: dict):
+    class StandInHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            counter[request["method"]] = counter.get(request["method"], 0) + 1
+
+            time.sleep(stall if random.random() < stall_rate else latency)
+
+            if random.random() < error_rate:
+                self.respond(429, b"")
+                return
+
+            result = "5" * 88 if request["method"] == "sendTransaction" else 250_000_000
+            self.respond(200, json.dumps({"jsonrpc": "2.0", "id": request["id"], "result": result}).encode())
+
+        def respond(self, status: int, body: bytes):
+            try:
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                # the losing request of a hedged pair was cancelled by the client
+                pass
+
+        def log_message(self, format, *args):
+            pass
+
+    return StandInHandler
+
+
+def start_stand_in(**kwargs) -> tuple[str, ThreadingHTTPServer, dict]:
+    counter = {}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), stand_in_handler(counter=counter, **kwargs))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}", server, counter
+
+
+def percentile(values: list[float], share: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * share), len(ordered) - 1)]
+
+
+async def run_reads(provider: RateLimitedProvider, requests: int, concurrency: int) -> tuple[list[float], int]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            started = perf_counter()
+            try:
+                await provider.make_request(GetBlockHeight(), GetBlockHeightResp)
+                latencies.append(perf_counter() - started)
+            except Exception:
+                errors += 1
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return latencies, errors
+
+
+def report(title: str, latencies: list[float], errors: int) -> None:
+    print(
+        f"{title:<24} p50 {percentile(latencies, 0.5) * 1000:7.1f} ms | p95 {percentile(latencies, 0.95) * 1000:7.1f} ms | "
+        f"p99 {percentile(latencies, 0.99) * 1000:7.1f} ms | errors {errors}"
+    )
+
+
+async def main(requests: int, concurrency: int, stall: float, stall_rate: float):
+    rate_limiter.set_rate("rpc", 0)
+
+    stand_ins = [
+        start_stand_in(latency=0.02, stall=stall, stall_rate=stall_rate, error_rate=0.0),
+        start_stand_in(latency=0.05, stall=stall, stall_rate=0.0, error_rate=0.0),
+        start_stand_in(latency=0.03, stall=stall, stall_rate=0.0, error_rate=0.3),
+    ]
+    endpoints = [endpoint for endpoint, _, _ in stand_ins]
+
+    single = RateLimitedProvider(endpoints[0])
+    routed = RoutedProvider(endpoints, router=RpcRouter())
+
+    try:
+        single_latencies, single_errors = await run_reads(single, requests, concurrency)
+        routed_latencies, routed_errors = await run_reads(routed, requests, concurrency)
+
+        sent = perf_counter()
+        await routed.make_request_unparsed(SendRawTransaction(b"\x00" * 64))
+        send_latency = perf_counter() - sent
+        await asyncio.sleep(stall)
+    finally:
+        await single.close()
+        await routed.close()
+        for _, server, _ in stand_ins:
+            server.shutdown()
+
+    print(f"requests: {requests} | concurrency: {concurrency} | stall {stall * 1000:.0f} ms on {stall_rate:.0%} of the fast endpoint")
+    report("single endpoint:", single_latencies, single_errors)
+    report("routed + hedged:", routed_latencies, routed_errors)
+    hedged = sum(counter.get("getBlockHeight", 0) for _, _, counter in stand_ins) - 2 * requests
+    reached = sum(1 for _, _, counter in stand_ins if counter.get("sendTransaction"))
+    print(f"hedged extra requests:   {hedged}")
+    print(f"sendTransaction:         first answer after {send_latency * 1000:.1f} ms, reached {reached} endpoints")
+    print(f"endpoint health:         {routed.router.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--stall", type=float, default=1.0)
+    parser.add_argument("--stall-rate", type=float, default=0.1)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.requests, args.concurrency, args.stall, args.stall_rate))
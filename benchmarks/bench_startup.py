@@ -0,0 +1,89 @@
+"""
+Cold-start cost of main.py, measured with `python -X importtime` in fresh interpreters.
+
+Every stage imports what main.py needs up to that point: the entry point itself, everything before
+the interactive menu shows up and everything a headless `main.py run` loads before the first wallet:
+
+    python -m benchmarks.bench_startup --runs 5 --top 10
+"""
+
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from time import perf_counter
+
+ROOT_DIR = Path(__file__).parent.parent.absolute()
+
+PREPARE = ["check_python", "utils.create_files", "utils.db_api.models", "utils.db_api.wallet_api"]
+
+STAGES = {
+    "entry point": ["main"],
+    "interactive menu": ["main", *PREPARE, "utils.output", "utils.git_version", "inquirer", "colorama", "rich.console"],
+    "headless run": ["main", *PREPARE, "utils.db_api.job_queue", "functions.activity"],
+}
+
+IMPORT_TIME = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+
+def measure(modules: list[str]) -> tuple[float, dict[str, tuple[int, int]]]:
+    """Wall time of a fresh interpreter importing the modules and the (self, cumulative) microseconds per module."""
+    started = perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {', '.join(modules)}"],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+    )
+    wall = perf_counter() - started
+
+    if result.returncode != 0:
+        raise RuntimeError(f"importing {modules} failed:\n{result.stderr[-2000:]}")
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME.match(line)
+        if match:
+            timings[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+    return wall, timings
+
+
+def main(runs: int, top: int):
+    # the settings file is read on import of data.settings, main.py creates it in prepare()
+    subprocess.run([sys.executable, "-m", "utils.create_files"], cwd=ROOT_DIR, check=True)
+
+    print(f"python {sys.version.split()[0]} | {runs} runs per stage, median of the warm runs (the first one also compiles bytecode)")
+
+    for stage, modules in STAGES.items():
+        walls, samples = [], []
+        for _ in range(runs + 1):
+            wall, timings = measure(modules)
+            walls.append(wall)
+            samples.append(timings)
+
+        warm = walls[1:] or walls
+        imported = statistics.median(sum(self_us for self_us, _ in timings.values()) for timings in samples[1:] or samples)
+        print(
+            f"\n{stage:<18} cold {walls[0] * 1000:7.1f} ms | warm {statistics.median(warm) * 1000:7.1f} ms | "
+            f"imports {imported / 1000:7.1f} ms in {len(samples[-1])} modules"
+        )
+
+        for module in modules:
+            if module in samples[-1]:
+                print(f"    {module:<32} {samples[-1][module][1] / 1000:7.1f} ms cumulative")
+
+        slowest = sorted(samples[-1].items(), key=lambda item: item[1][0], reverse=True)[:top]
+        print(f"  slowest {top} by self time:")
+        for module, (self_us, _) in slowest:
+            print(f"    {module:<32} {self_us / 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    main(args.runs, args.top)
@@ -22,7 +22,12 @@ ABIS_DIR = os.path.join(ROOT_DIR, "data", "abis")
 
 SALT_PATH = os.path.join(FILES_DIR, "salt.dat")
 
+# headless runs (cron, systemd) read the password from these instead of a prompt, .env works too
+PASSWORD_ENV = "WALLETS_PASSWORD"
+PASSWORD_FILE_ENV = "WALLETS_PASSWORD_FILE"
+
 CIPHER_SUITE = None
+CIPHER_KEY = None
 LOCK = asyncio.Lock()
 
 LOGS_DIR = os.path.join(FILES_DIR, "logs")
@@ -1,69 +1,195 @@
+import asyncio
+import os
 import sys
 
 import yaml
 from loguru import logger
 
 from data.config import LOG_FILE, SETTINGS_FILE
-from libs.eth_async.classes import Singleton
 
+# seconds between checks of the settings file modification time
+SETTINGS_POLL_INTERVAL = 5
+LOG_LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR"]
 
-class Settings(Singleton):
-    def __init__(self):
-        with open(SETTINGS_FILE, "r") as file:
-            json_data = yaml.safe_load(file) or {}
 
-        self.check_git_updates = json_data.get("check_git_updates", True)
-        self.private_key_encryption = json_data.get("private_key_encryption", False)
-        self.threads = json_data.get("threads", 4)
-        self.range_wallets_to_run = json_data.get("range_wallets_to_run", [])
-        self.exact_wallets_to_run = json_data.get("exact_wallets_to_run", [])
-        self.shuffle_wallets = json_data.get("shuffle_wallets", True)
-        self.show_wallet_address_logs = json_data.get("show_wallet_address_logs", True)
-        self.log_level = json_data.get("log_level", "INFO")
-        self.random_pause_start_wallet_min = json_data.get("random_pause_start_wallet", {}).get("min")
-        self.random_pause_start_wallet_max = json_data.get("random_pause_start_wallet", {}).get("max")
-        self.random_pause_between_actions_min = json_data.get("random_pause_between_actions", {}).get("min")
-        self.random_pause_between_actions_max = json_data.get("random_pause_between_actions", {}).get("max")
-        self.random_pause_wallet_after_completion_min = json_data.get("random_pause_wallet_after_completion", {}).get("min")
-        self.random_pause_wallet_after_completion_max = json_data.get("random_pause_wallet_after_completion", {}).get("max")
+class Settings:
+    """
+    Immutable snapshot of files/settings.yaml.
 
-        self.withdrawal_amount_min = json_data.get("withdrawal_amount", {}).get("min")
-        self.withdrawal_amount_max = json_data.get("withdrawal_amount", {}).get("max")
+    Settings() returns the current snapshot without touching the disk. The file is parsed once and again
+    only when settings_watcher sees its modification time change, the new snapshot then replaces the old one
+    in a single assignment, so a caller never sees a half-updated mix of both.
+    """
 
-        self.refill_usd_amount_min = json_data.get("refill_usd_amount", {}).get("min")
-        self.refill_usd_amount_max = json_data.get("refill_usd_amount", {}).get("max")
+    _current: "Settings | None" = None
 
-        self.swap_amount_percentage_min = json_data.get("swap_amount_percentage", {}).get("min", 80)
-        self.swap_amount_percentage_max = json_data.get("swap_amount_percentage", {}).get("max", 100)
+    def __new__(cls) -> "Settings":
+        current = cls._current
+        if current is None:
+            current = cls._current = cls.load()
+        return current
 
-        self.invite_codes = json_data.get("invite_codes", "")
+    def __init__(self):
+        # the snapshot is built by load()
+        pass
+
+    def __setattr__(self, name, value):
+        if getattr(self, "_frozen", False):
+            raise AttributeError(f"Settings are read-only, edit {SETTINGS_FILE} instead of setting {name}")
+        super().__setattr__(name, value)
+
+    @classmethod
+    def load(cls, path: str = SETTINGS_FILE) -> "Settings":
+        mtime = os.stat(path).st_mtime_ns
+        with open(path, "r") as file:
+            json_data = yaml.safe_load(file) or {}
 
-        self.swaps_count_min = json_data.get("swaps_count", {}).get("min")
-        self.swaps_count_max = json_data.get("swaps_count", {}).get("max")
+        snapshot = object.__new__(cls)
+        snapshot._parse(json_data)
+        snapshot.mtime = mtime
+        snapshot._frozen = True
+        return snapshot
+
+    @classmethod
+    def swap(cls, snapshot: "Settings") -> None:
+        cls._current = snapshot
+
+    def _parse(self, json_data: dict) -> None:
+        self.check_git_updates: bool = json_data.get("check_git_updates", True)
+        self.check_git_updates_interval_hours: float = json_data.get("check_git_updates_interval_hours", 12)
+        self.private_key_encryption: bool = json_data.get("private_key_encryption", False)
+        self.threads: int = json_data.get("threads", 4)
+        self.range_wallets_to_run: list[int] = json_data.get("range_wallets_to_run", [])
+        self.exact_wallets_to_run: list[int] = json_data.get("exact_wallets_to_run", [])
+        self.shuffle_wallets: bool = json_data.get("shuffle_wallets", True)
+        self.show_wallet_address_logs: bool = json_data.get("show_wallet_address_logs", True)
+        self.log_level: str = json_data.get("log_level", "INFO")
+        if self.log_level not in LOG_LEVELS:
+            raise ValueError(f"Invalid log level: {self.log_level}. Must be one of: {', '.join(LOG_LEVELS)}")
+        self.random_pause_start_wallet_min: int | None = json_data.get("random_pause_start_wallet", {}).get("min")
+        self.random_pause_start_wallet_max: int | None = json_data.get("random_pause_start_wallet", {}).get("max")
+        self.random_pause_between_actions_min: int | None = json_data.get("random_pause_between_actions", {}).get("min")
+        self.random_pause_between_actions_max: int | None = json_data.get("random_pause_between_actions", {}).get("max")
+        self.random_pause_wallet_after_completion_min: int | None = json_data.get("random_pause_wallet_after_completion", {}).get("min")
+        self.random_pause_wallet_after_completion_max: int | None = json_data.get("random_pause_wallet_after_completion", {}).get("max")
+
+        self.withdrawal_amount_min: float | None = json_data.get("withdrawal_amount", {}).get("min")
+        self.withdrawal_amount_max: float | None = json_data.get("withdrawal_amount", {}).get("max")
+
+        self.refill_usd_amount_min: int | None = json_data.get("refill_usd_amount", {}).get("min")
+        self.refill_usd_amount_max: int | None = json_data.get("refill_usd_amount", {}).get("max")
+
+        self.swap_amount_percentage_min: int = json_data.get("swap_amount_percentage", {}).get("min", 80)
+        self.swap_amount_percentage_max: int = json_data.get("swap_amount_percentage", {}).get("max", 100)
+
+        self.invite_codes: str = json_data.get("invite_codes", "")
+
+        self.swaps_count_min: int | None = json_data.get("swaps_count", {}).get("min")
+        self.swaps_count_max: int | None = json_data.get("swaps_count", {}).get("max")
+
+        self.swap_tokens: list[str] = json_data.get("swap_tokens", ["USDT", "USDC"])
+
+        self.okx_api_key: str = json_data.get("okx_api_key", "")
+        self.okx_api_secret: str = json_data.get("okx_api_secret", "")
+        self.okx_passphrase: str = json_data.get("okx_passphrase", "")
+
+        self.sol_balance_for_commissions_min: float | None = json_data.get("sol_balance_for_commissions", {}).get("min")
+        self.sol_balance_for_commissions_max: float | None = json_data.get("sol_balance_for_commissions", {}).get("max")
+
+        self.exclude_wallets_to_reg_ref: str = json_data.get("exclude_wallets_to_reg_ref", "")
+
+        self.tg_bot_id: str = json_data.get("tg_bot_id", "")
+        self.tg_user_id: str = json_data.get("tg_user_id", "")
+
+        self.retry: int = json_data.get("retry", 3)
+
+        self.rate_limits: dict[str, float] = json_data.get("rate_limits", {}) or {}
+        self.rpc_endpoints: dict[str, list[str]] = json_data.get("rpc_endpoints", {}) or {}
+
+
+class SettingsWatcher:
+    """Reloads the settings snapshot when the modification time of the settings file changes."""
+
+    def __init__(self, path: str = SETTINGS_FILE, interval: float = SETTINGS_POLL_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+        self._failed_mtime: int | None = None
+        self._missing = False
+
+    def check(self) -> bool:
+        """Swaps in a fresh snapshot if the file changed, a missing file or one that fails to parse keeps the previous one."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            if not self._missing:
+                self._missing = True
+                logger.error(f"Settings | can't read {self.path}, keeping the previous settings: {e}")
+            return False
+        self._missing = False
+
+        if mtime in (Settings().mtime, self._failed_mtime):
+            return False
+
+        try:
+            snapshot = Settings.load(self.path)
+        except Exception as e:
+            self._failed_mtime = mtime
+            logger.error(f"Settings | failed to reload {self.path}, keeping the previous settings: {e}")
+            return False
+
+        previous = Settings()
+        Settings.swap(snapshot)
+        if snapshot.log_level != previous.log_level:
+            set_log_level(snapshot.log_level)
+
+        logger.info(f"Settings | reloaded {self.path}")
+        return True
+
+    async def watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            self.check()
+
+    def start(self) -> None:
+        """Checks the file now and keeps watching it from a task of the running event loop."""
+        self.check()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.watch())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
 
-        self.swap_tokens = json_data.get("swap_tokens", ["USDT", "USDC"])
 
-        self.okx_api_key = json_data.get("okx_api_key", "")
-        self.okx_api_secret = json_data.get("okx_api_secret", "")
-        self.okx_passphrase = json_data.get("okx_passphrase", "")
+_stderr_handler: int | None = None
 
-        self.sol_balance_for_commissions_min = json_data.get("sol_balance_for_commissions", {}).get("min")
-        self.sol_balance_for_commissions_max = json_data.get("sol_balance_for_commissions", {}).get("max")
 
-        self.exclude_wallets_to_reg_ref = json_data.get("exclude_wallets_to_reg_ref", "")
+def set_log_level(level: str) -> None:
+    """Replaces the stderr sink with one of the new level, sinks set up elsewhere (worker processes) are kept."""
+    global _stderr_handler
 
-        self.tg_bot_id = json_data.get("tg_bot_id", "")
-        self.tg_user_id = json_data.get("tg_user_id", "")
+    if _stderr_handler is not None:
+        try:
+            logger.remove(_stderr_handler)
+        except ValueError:
+            # the sinks were replaced after import, like the log queue of a worker process
+            return
+    _stderr_handler = logger.add(sys.stderr, level=level)
 
-        self.retry = json_data.get("retry", {})
 
+settings_watcher = SettingsWatcher()
 
 # Configure the logger based on the settings
 settings = Settings()
 
-if settings.log_level not in ["DEBUG", "INFO", "WARNING", "ERROR"]:
-    raise ValueError(f"Invalid log level: {settings.log_level}. Must be one of: DEBUG, INFO, WARNING, ERROR")
 logger.remove()  # Remove the default logger
-logger.add(sys.stderr, level=settings.log_level)
+set_log_level(settings.log_level)
 
 logger.add(LOG_FILE, level="DEBUG")
@@ -1,35 +1,50 @@
 import asyncio
 import random
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 from typing import List
 
 from loguru import logger
 
-from data.settings import Settings
+from data.settings import Settings, settings_watcher
 from functions.controller import Controller
+from libs.fleet_scanner import FleetScanner
+from libs.sol_async_py.blockhash import close_blockhash_caches
 from libs.sol_async_py.client import Client
+from libs.sol_async_py.compute_units import compute_units
+from libs.sol_async_py.confirmation import close_confirmation_engines, confirmation_stats
 from libs.sol_async_py.data.models import Networks
+from libs.sol_async_py.fees import close_fee_oracles
+from libs.sol_async_py.keypairs import keypair_cache
+from libs.sol_async_py.pda import derivations
+from libs.sol_async_py.rpc_pool import rpc_pool
+from libs.sol_async_py.rpc_router import rpc_router
+from utils.browser import Browser, session_pool
+from utils.db_api.job_queue import DONE, FAILED, IDLE_POLL_INTERVAL, JobQueue
 from utils.db_api.models import Wallet
 from utils.db_api.wallet_api import db
-from utils.encryption import check_encrypt_param
+from utils.encryption import check_encrypt_param, forget_private_keys, preload_private_keys
+from utils.key_vault import key_vault
+from utils.rate_limiter import rate_limiter
 
 
-async def random_sleep_before_start(wallet):
-    random_sleep = random.randint(Settings().random_pause_start_wallet_min, Settings().random_pause_start_wallet_max)
-    now = datetime.now()
-
-    logger.info(f"{wallet} Start at {now + timedelta(seconds=random_sleep)} sleep {random_sleep} seconds before start actions")
-    await asyncio.sleep(random_sleep)
+@asynccontextmanager
+async def wallet_session(wallet):
+    async with (
+        Browser(wallet=wallet),
+        Client(private_key=wallet.private_key, network=Networks.Solana, proxy=wallet.proxy, wallet_id=wallet.id) as client,
+    ):
+        yield client
 
 
 async def update_statistics(wallet):
     try:
-        await random_sleep_before_start(wallet=wallet)
-
-        client = Client(private_key=wallet.private_key, network=Networks.Solana, proxy=wallet.proxy)
-        controller = Controller(client=client, wallet=wallet)
+        async with wallet_session(wallet) as client:
+            controller = Controller(client=client, wallet=wallet)
 
-        await controller.update_db_by_user_info()
+            await controller.update_db_by_user_info()
 
     except Exception as e:
         logger.error(f"Core | Activity | {wallet} | {repr(e)}")
@@ -38,13 +53,11 @@ async def update_statistics(wallet):
 
 async def deposit(wallet):
     try:
-        await random_sleep_before_start(wallet=wallet)
-
-        client = Client(private_key=wallet.private_key, network=Networks.Solana, proxy=wallet.proxy)
-        controller = Controller(client=client, wallet=wallet)
+        async with wallet_session(wallet) as client:
+            controller = Controller(client=client, wallet=wallet)
 
-        stats = await controller.deposit_controller()
-        logger.success(stats)
+            stats = await controller.deposit_controller()
+            logger.success(stats)
 
     except Exception as e:
         logger.error(f"Core | Deposit | {wallet} | {repr(e)}")
@@ -53,39 +66,37 @@ async def deposit(wallet):
 
 async def swaps_activity_task(wallet):
     try:
-        await random_sleep_before_start(wallet=wallet)
+        async with wallet_session(wallet) as client:
+            controller = Controller(client=client, wallet=wallet)
 
-        client = Client(private_key=wallet.private_key, network=Networks.Solana, proxy=wallet.proxy)
-        controller = Controller(client=client, wallet=wallet)
+            actions = await controller.build_actions()
 
-        actions = await controller.build_actions()
+            if isinstance(actions, str):
+                logger.warning(actions)
 
-        if isinstance(actions, str):
-            logger.warning(actions)
+            else:
+                logger.info(f"{wallet} | Started Activity Tasks | Wallet will do {len(actions)} actions")
 
-        else:
-            logger.info(f"{wallet} | Started Activity Tasks | Wallet will do {len(actions)} actions")
+                for action in actions:
+                    sleep = random.randint(Settings().random_pause_between_actions_min, Settings().random_pause_between_actions_max)
+                    try:
+                        status = await action()
 
-            for action in actions:
-                sleep = random.randint(Settings().random_pause_between_actions_min, Settings().random_pause_between_actions_max)
-                try:
-                    status = await action()
+                        if "Failed" not in status:
+                            logger.success(status)
 
-                    if "Failed" not in status:
-                        logger.success(status)
+                        else:
+                            logger.error(status)
 
-                    else:
-                        logger.error(status)
+                    except Exception as e:
+                        logger.error(e)
+                        continue
 
-                except Exception as e:
-                    logger.error(e)
-                    continue
+                    finally:
+                        logger.info(f"{wallet} | Started sleep {sleep} sec for next action....")
+                        await asyncio.sleep(sleep)
 
-                finally:
-                    logger.info(f"{wallet} | Started sleep {sleep} sec for next action....")
-                    await asyncio.sleep(sleep)
-
-        await controller.update_db_by_user_info()
+            await controller.update_db_by_user_info()
 
     except asyncio.CancelledError:
         raise
@@ -97,13 +108,11 @@ async def swaps_activity_task(wallet):
 
 async def swap_sol_to_stable(wallet):
     try:
-        await random_sleep_before_start(wallet=wallet)
-
-        client = Client(private_key=wallet.private_key, network=Networks.Solana, proxy=wallet.proxy)
-        controller = Controller(client=client, wallet=wallet)
+        async with wallet_session(wallet) as client:
+            controller = Controller(client=client, wallet=wallet)
 
-        stats = await controller.swap_to_stables()
-        logger.success(stats)
+            stats = await controller.swap_to_stables()
+            logger.success(stats)
 
     except Exception as e:
         logger.error(f"Core | Activity | {wallet} | {repr(e)}")
@@ -112,56 +121,192 @@ async def swap_sol_to_stable(wallet):
 
 async def withdraw_and_swap(wallet):
     try:
-        await random_sleep_before_start(wallet=wallet)
-
-        client = Client(private_key=wallet.private_key, network=Networks.Solana, proxy=wallet.proxy)
-        controller = Controller(client=client, wallet=wallet)
+        async with wallet_session(wallet) as client:
+            controller = Controller(client=client, wallet=wallet)
 
-        stats = await controller.perform_withdraw_and_swap_to_stables()
-        logger.success(stats)
+            stats = await controller.perform_withdraw_and_swap_to_stables()
+            logger.success(stats)
 
     except Exception as e:
         logger.error(f"Core | Withdraw and Swap | {wallet} | {repr(e)}")
         raise e
 
 
-async def execute(wallets: List[Wallet], task_func, random_pause_wallet_after_completion: int = 0):
-    while True:
-        semaphore = asyncio.Semaphore(min(len(wallets), Settings().threads))
-
-        if Settings().shuffle_wallets:
-            random.shuffle(wallets)
-
-        async def sem_task(wallet: Wallet):
-            async with semaphore:
-                try:
-                    await task_func(wallet)
-                except Exception as e:
-                    logger.error(f"[{wallet.id}] failed: {repr(e)}")
-
-        tasks = [asyncio.create_task(sem_task(wallet)) for wallet in wallets]
-        await asyncio.gather(*tasks, return_exceptions=True)
-
-        if random_pause_wallet_after_completion == 0:
-            break
-
-        # update dynamically the pause time
-        random_pause_wallet_after_completion = random.randint(
-            Settings().random_pause_wallet_after_completion_min, Settings().random_pause_wallet_after_completion_max
-        )
-
-        next_run = datetime.now() + timedelta(seconds=random_pause_wallet_after_completion)
-        logger.info(f"Sleeping {random_pause_wallet_after_completion} seconds. Next run at: {next_run.strftime('%Y-%m-%d %H:%M:%S')}")
-        await asyncio.sleep(random_pause_wallet_after_completion)
-
-
-async def activity(action: int):
-    if not check_encrypt_param():
-        logger.error(f"Decryption Failed | Wrong Password")
-        return
+def log_cycle_stats() -> None:
+    logger.debug(f"RPC pool after cycle | {rpc_pool.stats()}")
+    logger.debug(f"RPC endpoints after cycle | {rpc_router.stats()}")
+    logger.debug(f"Confirmations after cycle | {confirmation_stats()}")
+    logger.debug(f"Compute units after cycle | {compute_units.stats()}")
+    logger.debug(f"Keypairs after cycle | {keypair_cache.stats()}")
+    logger.debug(f"PDA derivations after cycle | {derivations.stats()}")
+    logger.debug(f"Rate limits after cycle | {rate_limiter.stats()}")
+    db.commit_pending()
+    logger.debug(f"DB writes after cycle | {db.write_stats}")
+    logger.debug(f"HTTP sessions after cycle | {session_pool.stats()}")
+
+
+async def trim_shared_clients() -> None:
+    """Cycle boundary of a repeating action: logs the stats and closes idle pooled sessions, clients in use stay open."""
+    log_cycle_stats()
+    await session_pool.evict_idle()
+
+
+async def close_shared_clients() -> None:
+    log_cycle_stats()
+    await session_pool.close_all()
+    await close_confirmation_engines()
+    await close_blockhash_caches()
+    await close_fee_oracles()
+    await rpc_pool.close_all()
+
+
+def random_pause(pause_min: int | None, pause_max: int | None) -> int:
+    if not pause_max:
+        return 0
+    return random.randint(pause_min or 0, pause_max)
+
+
+async def run_jobs(queue: JobQueue, wallets: dict[int, Wallet], task_func, threads: int, repeat: bool = False) -> Counter:
+    """
+    Workers lease whichever wallet is due next. A repeating action puts every finished wallet back into the queue
+    with its own next_run_at, so the workers never wait for the slowest wallet of a cycle.
+
+    Queue writes run in threads, a write waiting for the SQLite lock held by another process or by the write-behind
+    flush of wallet values must not stall the event loop.
+    """
+    processed = Counter()
+
+    async def run_next() -> bool:
+        """Runs the next due job, False once a non-repeating action has no jobs left."""
+        job = await asyncio.to_thread(queue.lease)
+        if job is None:
+            wait = queue.seconds_until_due()
+            if wait is None and not repeat:
+                return False
+            await asyncio.sleep(min(wait if wait is not None else IDLE_POLL_INTERVAL, IDLE_POLL_INTERVAL))
+            return True
+
+        wallet = wallets.get(job.wallet_id)
+        if wallet is None:
+            logger.warning(f"{job} | wallet is not in the database or not selected anymore, dropping the job")
+            await asyncio.to_thread(queue.drop, job)
+            return True
+
+        heartbeat = asyncio.create_task(queue.keep_alive(job))
+        status = DONE
+
+        try:
+            await task_func(wallet)
+        except Exception as e:
+            logger.error(f"[{job.wallet_id}] failed: {repr(e)}")
+            status = FAILED
+        finally:
+            heartbeat.cancel()
+
+        processed[status] += 1
+
+        if not repeat:
+            await asyncio.to_thread(queue.finish, job, status)
+            return True
+
+        pause = random_pause(Settings().random_pause_wallet_after_completion_min, Settings().random_pause_wallet_after_completion_max)
+        db.save_later(wallet, next_run_at=time.time() + pause)
+        await asyncio.to_thread(queue.reschedule, job, wallet.next_run_at)
+
+        next_run = datetime.now() + timedelta(seconds=pause)
+        logger.info(f"{wallet} | Sleeping {pause} seconds. Next run at: {next_run.strftime('%Y-%m-%d %H:%M:%S')}")
+
+        # workers of a repeating action never return, a cycle ends after as many runs as there are wallets
+        runs = sum(processed.values())
+        if runs % len(wallets) == 0:
+            logger.info(f"Job queue | cycle {runs // len(wallets)} done | {dict(processed)}")
+            await trim_shared_clients()
+        return True
+
+    async def worker():
+        while True:
+            try:
+                if not await run_next():
+                    return
+            except Exception as e:
+                # a job whose lease was not released is leased again once the lease expires
+                logger.error(f"Job queue | worker error, retrying in {IDLE_POLL_INTERVAL}s: {repr(e)}")
+                await asyncio.sleep(IDLE_POLL_INTERVAL)
+
+    await asyncio.gather(*(worker() for _ in range(threads)), return_exceptions=True)
+    return processed
+
+
+def schedule_jobs(queue: JobQueue, wallets: List[Wallet], repeat: bool = False) -> None:
+    now = time.time()
+    start_at = {}
+    for wallet in wallets:
+        start_at[wallet.id] = now + random_pause(Settings().random_pause_start_wallet_min, Settings().random_pause_start_wallet_max)
+        # a repeating action resumes the schedule of wallets that are still pausing after their last run
+        if repeat and (wallet.next_run_at or 0) > now:
+            start_at[wallet.id] = wallet.next_run_at
+
+    queue.sync([wallet.id for wallet in wallets], shuffle=Settings().shuffle_wallets, next_run_at=start_at)
+    queue.requeue_stale()
+
+
+async def execute(
+    wallets: List[Wallet], task_func, repeat: bool = False, action: int = 0, schedule: bool = True, threads: int | None = None
+) -> Counter:
+    """Runs the jobs of an action until none are left; schedule=False joins a queue scheduled by another process."""
+    queue = JobQueue(action=action)
+    if schedule:
+        schedule_jobs(queue, wallets, repeat)
+
+    wallets_by_id = {wallet.id: wallet for wallet in wallets}
+    processed = Counter()
+    threads = min(len(wallets), threads or Settings().threads)
+    # edits of settings.yaml apply to the running wallets without a restart
+    settings_watcher.start()
 
+    try:
+        # decrypt the whole fleet up front on the key vault threads instead of once per Client on the event loop.
+        # A worker process of a sharded run only leases a share of the fleet, it decrypts the keys of its jobs on first use
+        if schedule:
+            started = time.perf_counter()
+            if decrypted := await asyncio.to_thread(preload_private_keys, [wallet.private_key for wallet in wallets]):
+                logger.debug(f"Key vault | {decrypted} keys decrypted in {time.perf_counter() - started:.2f}s")
+
+        while True:
+            logger.info(f"Job queue | {queue.counts()}")
+            processed += await run_jobs(queue, wallets_by_id, task_func, threads=threads, repeat=repeat)
+            await close_shared_clients()
+
+            if queue.is_cycle_done():
+                queue.clear()
+                return processed
+
+            # the remaining jobs are leased by other workers
+            await asyncio.sleep(IDLE_POLL_INTERVAL)
+
+    finally:
+        await settings_watcher.stop()
+        logger.debug(f"Key vault | {key_vault.stats()}")
+        forget_private_keys()
+
+
+# action -> (task, repeats after random_pause_wallet_after_completion)
+ACTIONS = {
+    1: (swaps_activity_task, True),
+    2: (withdraw_and_swap, False),
+    3: (swap_sol_to_stable, False),
+    4: (update_statistics, False),
+    5: (deposit, False),
+}
+
+
+def select_wallets(numbers: set[int] | None = None) -> List[Wallet]:
+    """Wallets to run by their 1-based position, explicit numbers take precedence over the settings."""
     wallets = db.all(Wallet)
 
+    if numbers:
+        return [wallet for i, wallet in enumerate(wallets, start=1) if i in numbers]
+
     range_wallets = Settings().range_wallets_to_run
     if range_wallets != [0, 0]:
         start, end = range_wallets
@@ -170,31 +315,25 @@ async def activity(action: int):
         if Settings().exact_wallets_to_run:
             wallets = [wallet for i, wallet in enumerate(wallets, start=1) if i in Settings().exact_wallets_to_run]
 
-    if action == 1:
-        await execute(
-            wallets,
-            swaps_activity_task,
-            random.randint(Settings().random_pause_wallet_after_completion_min, Settings().random_pause_wallet_after_completion_max),
-        )
-
-    if action == 2:
-        await execute(
-            wallets,
-            withdraw_and_swap,
-        )
-    if action == 3:
-        await execute(
-            wallets,
-            swap_sol_to_stable,
-        )
+    return wallets
+
+
+async def activity(action: int, wallet_numbers: set[int] | None = None, threads: int | None = None, once: bool = False) -> Counter | None:
+    """Runs an action and returns the done/failed counts, None when the password is wrong."""
+    try:
+        unlocked = check_encrypt_param()
+    except RuntimeError:
+        # out of password attempts
+        unlocked = False
+
+    if not unlocked:
+        logger.error("Decryption Failed | Wrong Password")
+        return None
+
+    wallets = select_wallets(wallet_numbers)
+    task_func, repeat = ACTIONS[action]
+
     if action == 4:
-        await execute(
-            wallets,
-            update_statistics,
-        )
-
-    if action == 5:
-        await execute(
-            wallets,
-            deposit,
-        )
+        await FleetScanner().scan(wallets)
+
+    return await execute(wallets, task_func, repeat=repeat and not once, action=action, threads=threads)
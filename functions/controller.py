@@ -28,15 +28,15 @@ class Controller:
         leaderbord = await self.titan.get_leaderbord()
 
         if leaderbord.get('success'):
-            self.wallet.rank = leaderbord.get('user_rank')
+            db.save_later(self.wallet, rank=leaderbord.get('user_rank'))
 
         stats = await self.titan.get_user_stats()
 
         if stats.get('success'):
-            self.wallet.total_trades = stats.get('total_trades')
-            self.wallet.volume_portal = int(round(stats.get('total_volume_usd'), 0))
-            self.wallet.total_edge_usd = stats.get('total_edge_usd')
-            db.commit()
+            db.save_later(self.wallet,
+                          total_trades=stats.get('total_trades'),
+                          volume_portal=int(round(stats.get('total_volume_usd'), 0)),
+                          total_edge_usd=stats.get('total_edge_usd'))
 
         logger.info(f"{self.wallet} -> "
                     f"Rank: [{self.wallet.rank}] | "
@@ -91,11 +91,12 @@ class Controller:
         raise Exception(f"Error | {res}")
 
     @controller_log('Refill Solana from Tokens')
-    async def refill_sol_balance(self):
+    async def refill_sol_balance(self, token_balances: dict = None):
         settings = Settings()
-        tokens = [TokenContracts.USDC, TokenContracts.USDT]
 
-        token_balances = await self.titan.balance_map(token_map=tokens)
+        if token_balances is None:
+            tokens = [TokenContracts.USDC, TokenContracts.USDT]
+            token_balances = await self.titan.balance_map(token_map=tokens)
 
         refill_amount = random.randint(settings.refill_usd_amount_min, settings.refill_usd_amount_max)
 
@@ -169,10 +170,12 @@ class Controller:
             raise Exception(f"No deposit address provided, skipping deposit")
 
         balances = await self.titan.balance_map(token_map=TOKENS_MAP)
+        swapped = False
 
         for tok, balance in balances.items():
             if tok != TokenContracts.SOL:
                 if float(balance.Ether) > 0:
+                    swapped = True
                     swap_back = await self.titan._swap(
                         from_token=tok, to_token=TokenContracts.SOL, amount=balances[tok], to_token_decimals=balances[TokenContracts.SOL].decimals
                     )
@@ -180,7 +183,7 @@ class Controller:
                     logger.success(f"{swap_back} | sleeping {sleep} seconds for next tx")
                     await asyncio.sleep(sleep)
 
-        sol_balance = await self.client.wallet.balance()
+        sol_balance = balances[TokenContracts.SOL] if not swapped else await self.client.wallet.balance()
 
         amount = TokenAmount(
             amount=sol_balance.Ether - Decimal(randfloat(from_=0.001, to_=0.002, step=0.0001)), decimals=sol_balance.decimals)
@@ -206,7 +209,8 @@ class Controller:
 
         swaps_count = random.randint(settings.swaps_count_min, settings.swaps_count_max)
 
-        balance = await self.client.wallet.balance()
+        balances = await self.titan.balance_map(token_map=TOKENS_MAP)
+        balance = balances[TokenContracts.SOL]
 
         initial = False
         if float(balance.Ether) == 0.0:
@@ -218,7 +222,7 @@ class Controller:
         final_actions = []
 
         tokens = [TokenContracts.USDC, TokenContracts.USDT]
-        balance_map = await self.titan.balance_map(token_map=tokens)
+        balance_map = {token: balances[token] for token in tokens}
 
         any_token_balances = [t for t in list(balance_map.values()) if float(t.Ether) > 10]
 
@@ -232,6 +236,7 @@ class Controller:
 
             initial_swap = await self.make_first_swap(for_comissions=min_sol_for_comission)
             logger.success(initial_swap)
+            balance_map = None
 
         if self.wallet.id not in settings.exclude_wallets_to_reg_ref:
 
@@ -250,7 +255,7 @@ class Controller:
 
         if float(balance.Ether) <= settings.sol_balance_for_commissions_min and not initial:
 
-            refill_sol_balance = await self.refill_sol_balance()
+            refill_sol_balance = await self.refill_sol_balance(token_balances=balance_map)
             logger.success(refill_sol_balance)
 
         if float(balance.Ether) >= 0:
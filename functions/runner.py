@@ -0,0 +1,118 @@
+"""
+Headless runner that spreads one action over several worker processes.
+
+The parent asks for the password once, schedules the jobs of the action and starts the workers.
+Every worker runs its own event loop and leases jobs from the shared SQLite queue, so wallets are
+distributed dynamically and a slow wallet never holds back a whole shard. Logs of the workers are
+forwarded to the parent, which also sums up their stats:
+
+    python main.py run --action swaps --processes 4
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from loguru import logger
+
+from data import config
+from data.settings import Settings
+from utils.db_api.job_queue import JobQueue
+from utils.encryption import check_encrypt_param, set_cipher_key
+
+WORKER_LOG_FORMAT = "{time:YYYY-MM-DD HH:mm:ss.SSS} | {level: <8} | worker {process} | {name}:{function}:{line} - {message}"
+
+
+def _init_worker(log_queue, cipher_key: bytes | None) -> None:
+    from utils.pyarmor_bootstrap import ensure_pyarmor_runtime_on_path
+
+    ensure_pyarmor_runtime_on_path()
+
+    logger.remove()
+    logger.add(lambda message: log_queue.put((message.record["level"].name, str(message))), format=WORKER_LOG_FORMAT, level="DEBUG")
+
+    if cipher_key is not None:
+        set_cipher_key(cipher_key)
+
+
+def _run_worker(action: int, wallet_numbers: set[int] | None, threads: int | None, once: bool) -> dict:
+    from functions.activity import ACTIONS, execute, select_wallets
+
+    task_func, repeat = ACTIONS[action]
+    processed = asyncio.run(
+        execute(select_wallets(wallet_numbers), task_func, repeat=repeat and not once, action=action, schedule=False, threads=threads)
+    )
+    return {"pid": os.getpid(), **processed}
+
+
+def _forward_logs(log_queue) -> None:
+    while (item := log_queue.get()) is not None:
+        level, text = item
+        logger.opt(raw=True).log(level, text)
+
+
+async def run_sharded(
+    action: int, processes: int | None = None, wallet_numbers: set[int] | None = None, threads: int | None = None, once: bool = False
+) -> Counter | None:
+    """Runs an action over worker processes and returns the summed done/failed counts, None when the password is wrong."""
+    from functions.activity import ACTIONS, schedule_jobs, select_wallets
+    from libs.fleet_scanner import FleetScanner
+
+    try:
+        unlocked = check_encrypt_param()
+    except RuntimeError:
+        # out of password attempts
+        unlocked = False
+
+    if not unlocked:
+        logger.error("Decryption Failed | Wrong Password")
+        return None
+
+    processes = processes or os.cpu_count() or 1
+
+    wallets = select_wallets(wallet_numbers)
+    _, repeat = ACTIONS[action]
+    repeat = repeat and not once
+
+    if action == 4:
+        await FleetScanner().scan(wallets)
+    schedule_jobs(JobQueue(action=action), wallets, repeat=repeat)
+
+    logger.info(f"Runner | action {action} | {len(wallets)} wallets | {processes} processes x {threads or Settings().threads} threads")
+
+    context = multiprocessing.get_context("spawn")
+    log_queue = context.Queue()
+    forwarder = threading.Thread(target=_forward_logs, args=(log_queue,), daemon=True)
+    forwarder.start()
+
+    loop = asyncio.get_running_loop()
+    total = Counter()
+
+    # the derived Fernet key, not the password, goes to the workers: pickled into the spawn pipe of each child process,
+    # never onto a command line or into the environment. Every worker holds it in memory like the parent does, and
+    # anyone who can read the memory of these processes (the same OS user or root) can decrypt the wallets.
+    try:
+        with ProcessPoolExecutor(
+            max_workers=processes, mp_context=context, initializer=_init_worker, initargs=(log_queue, config.CIPHER_KEY)
+        ) as pool:
+            workers = [loop.run_in_executor(pool, _run_worker, action, wallet_numbers, threads, once) for _ in range(processes)]
+            results = await asyncio.gather(*workers, return_exceptions=True)
+
+    finally:
+        log_queue.put(None)
+        forwarder.join()
+
+    for result in results:
+        if isinstance(result, BaseException):
+            logger.error(f"Runner | worker failed: {repr(result)}")
+            continue
+
+        pid = result.pop("pid")
+        logger.debug(f"Runner | worker {pid} | {result}")
+        total.update(result)
+
+    logger.success(f"Runner | action {action} finished | {dict(total)}")
+    return total
@@ -4,8 +4,9 @@ import base64
 from loguru import logger
 from solders.transaction import VersionedTransaction
 
+from libs.sol_async_py.blockhash import get_blockhash_cache
 from libs.sol_async_py.client import Client
-from libs.sol_async_py.data.models import RawContract, TokenAmount
+from libs.sol_async_py.data.models import RawContract
 from utils.browser import Browser
 from utils.db_api.models import Wallet
 
@@ -58,25 +59,10 @@ class Base:
         raise ValueError(f"Can not get {token_symbol + second_token} price from Binance")
 
     async def balance_map(self, token_map):
-        tokens = {}
+        tokens = list(token_map)
+        balances = await self.client.wallet.balances([None if token == TokenContracts.SOL else token for token in tokens])
 
-        for token in token_map:
-            try:
-                if token == TokenContracts.SOL:
-                    balance: TokenAmount = await self.client.wallet.balance()
-                else:
-                    balance: TokenAmount = await self.client.wallet.balance(token=token)
-
-                tokens[token] = balance if balance else None
-
-            except Exception as e:
-                if "Invalid param: could not find account" in str(e):
-                    decimals = await self.client.rpc.get_token_supply(token.mint)
-                    tokens[token] = TokenAmount(amount=0, decimals=decimals.value.decimals)
-
-                continue
-
-        return tokens
+        return dict(zip(tokens, balances))
 
     async def usd_balance_map(self, balances):
         usd_balanced = {}
@@ -98,9 +84,9 @@ class Base:
         api_bh = tx.message.recent_blockhash
         api_bh_str = str(api_bh)
 
-        latest = await self.client.rpc.get_latest_blockhash()
-        latest_bh = latest.value.blockhash
-        last_valid_bh = latest.value.last_valid_block_height
+        latest = await get_blockhash_cache(self.client.network).get()
+        latest_bh = latest.blockhash
+        last_valid_bh = latest.last_valid_block_height
         cur_height = (await self.client.rpc.get_block_height()).value
 
         is_valid = None
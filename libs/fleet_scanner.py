@@ -0,0 +1,117 @@
+import asyncio
+from typing import List
+
+from loguru import logger
+from solders.pubkey import Pubkey
+
+from libs.base_sol import TokenContracts
+from libs.sol_async_py.data.models import Network, Networks, TokenAmount
+from libs.sol_async_py.pda import get_associated_token_address
+from libs.sol_async_py.rpc_pool import rpc_pool
+from libs.sol_async_py.wallet import Wallet as SolWallet
+from utils.db_api.models import Wallet
+from utils.db_api.wallet_api import db
+
+MAX_ACCOUNTS_PER_REQUEST = 100
+# stands in for accounts that failed in the batch and in the per-account read
+UNREAD = object()
+
+# wallet column -> token; None is the native SOL balance of the wallet itself
+BALANCE_COLUMNS = {
+    "sol_balance": None,
+    "usdc_balance": TokenContracts.USDC,
+    "usdt_balance": TokenContracts.USDT,
+}
+
+
+class FleetScanner:
+    """
+    Scans balances of many wallets at once.
+
+    Token accounts are derived offline from the stored addresses and read with chunked
+    getMultipleAccounts calls, so 1000 wallets x 3 balances cost 30 requests instead of 3000.
+    """
+
+    def __init__(self, network: Network = Networks.Solana, chunk_size: int = MAX_ACCOUNTS_PER_REQUEST, concurrency: int = 4):
+        self.network = network
+        self.chunk_size = min(chunk_size, MAX_ACCOUNTS_PER_REQUEST)
+        self.concurrency = concurrency
+
+    @staticmethod
+    def derive_keys(wallets: List[Wallet]) -> list[tuple[Wallet, str, Pubkey]]:
+        keys = []
+        for wallet in wallets:
+            owner = Pubkey.from_string(wallet.address)
+            for column, token in BALANCE_COLUMNS.items():
+                if token is None:
+                    keys.append((wallet, column, owner))
+                else:
+                    ata = get_associated_token_address(wallet_address=owner, token_mint_address=token.mint, token_program_id=token.program)
+                    keys.append((wallet, column, ata))
+        return keys
+
+    async def fetch_accounts(self, pubkeys: list[Pubkey]) -> list:
+        """
+        Accounts in the order of the pubkeys, None for accounts that do not exist. A failed chunk is read again
+        account by account, accounts that still fail are UNREAD.
+        """
+        rpc = rpc_pool.acquire(endpoint=self.network.endpoint)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch_chunk(chunk: list[Pubkey]):
+            async with semaphore:
+                resp = await rpc.get_multiple_accounts(chunk)
+                return resp.value
+
+        async def fetch_one(pubkey: Pubkey):
+            async with semaphore:
+                resp = await rpc.get_account_info(pubkey)
+                return resp.value
+
+        try:
+            chunks = [pubkeys[i : i + self.chunk_size] for i in range(0, len(pubkeys), self.chunk_size)]
+            results = await asyncio.gather(*(fetch_chunk(chunk) for chunk in chunks), return_exceptions=True)
+
+            failed = [index for index, result in enumerate(results) if isinstance(result, BaseException)]
+            for index in failed:
+                logger.warning(
+                    f"Fleet Scanner | chunk of {len(chunks[index])} accounts failed, reading them one by one: {repr(results[index])}"
+                )
+                accounts = await asyncio.gather(*(fetch_one(pubkey) for pubkey in chunks[index]), return_exceptions=True)
+                results[index] = [UNREAD if isinstance(account, BaseException) else account for account in accounts]
+        finally:
+            await rpc_pool.release(endpoint=self.network.endpoint)
+
+        logger.debug(f"Fleet Scanner | fetched {len(pubkeys)} accounts in {len(chunks)} requests, {len(failed)} chunks read one by one")
+        return [account for chunk in results for account in chunk]
+
+    async def scan(self, wallets: List[Wallet]) -> int:
+        if not wallets:
+            return 0
+
+        keys = self.derive_keys(wallets)
+        accounts = await self.fetch_accounts([pubkey for _, _, pubkey in keys])
+
+        unread = 0
+        for (wallet, column, _), account in zip(keys, accounts):
+            if account is UNREAD:
+                # keep the last known balance instead of writing 0
+                unread += 1
+                continue
+
+            token = BALANCE_COLUMNS[column]
+            if token is None:
+                amount = TokenAmount(amount=account.lamports if account else 0, decimals=9, wei=True)
+            else:
+                raw = SolWallet.decode_token_amount(bytes(account.data)) if account else 0
+                amount = TokenAmount(amount=raw, decimals=token.decimals, wei=True)
+
+            db.save_later(wallet, **{column: float(amount.Ether)})
+
+        # the balances of the whole fleet in one transaction of this task's session
+        db.commit_pending()
+
+        if unread:
+            logger.warning(f"Fleet Scanner | {unread} balances could not be read and keep their previous value")
+        logger.success(f"Fleet Scanner | balances updated for {len(wallets)} wallets")
+        return len(wallets)
@@ -7,6 +7,7 @@ from urllib.parse import urlencode
 from libs.eth_async.utils.web_requests import async_get, async_post
 from libs.py_okx_async import exceptions
 from libs.py_okx_async.models import Methods, OKXCredentials
+from utils.rate_limiter import rate_limiter
 
 
 class Base:
@@ -110,6 +111,7 @@ class Base:
             "OK-ACCESS-TIMESTAMP": timestamp,
             "OK-ACCESS-PASSPHRASE": self.__credentials.passphrase,
         }
+        await rate_limiter.acquire(proxy=proxy, url=url)
         if method == Methods.POST:
             response = await async_post(url=url, headers=header, proxy=proxy, data=json.dumps(body) if isinstance(body, dict) else body)
         else:
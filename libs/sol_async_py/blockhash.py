@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from dataclasses import dataclass
+from time import monotonic
+
+from loguru import logger
+from solana.rpc import async_api
+from solders.hash import Hash
+
+from .data.models import Network
+from .rpc_pool import RawRequest, rpc_pool
+
+REFRESH_INTERVAL = 0.4
+# a blockhash older than MAX_AGE seconds is refetched inline, the refresher stops after IDLE_STOP seconds without readers
+MAX_AGE = 2
+IDLE_STOP = 30
+KNOWN_BLOCKHASHES = 512
+# a blockhash is valid for this many blocks, last_valid_block_height of the latest one is the current height plus this
+VALID_BLOCKS = 150
+
+
+@dataclass
+class CachedBlockhash:
+    blockhash: Hash
+    last_valid_block_height: int
+    fetched_at: float
+
+
+class BlockhashCache:
+    """
+    Latest blockhash of one RPC endpoint, refreshed in the background every REFRESH_INTERVAL by a single task.
+
+    prepare_tx takes the blockhash from here, so compiling a message needs no network call.
+    The refresher stops when nobody reads the cache for IDLE_STOP seconds and restarts on the next get().
+    The cache also remembers last_valid_block_height of recently seen blockhashes.
+    """
+
+    def __init__(self, network: Network, refresh_interval: float = REFRESH_INTERVAL):
+        self.network = network
+        self.refresh_interval = refresh_interval
+
+        self._latest: CachedBlockhash | None = None
+        self._last_used = monotonic()
+        self._known: dict[Hash, int] = {}
+        self._task: asyncio.Task | None = None
+        self._rpc: async_api.AsyncClient | None = None
+        self._lock = asyncio.Lock()
+
+    async def get(self) -> CachedBlockhash:
+        self._last_used = monotonic()
+        self._ensure_refresher()
+
+        latest = self._latest
+        if latest is None or monotonic() - latest.fetched_at > MAX_AGE:
+            async with self._lock:
+                if self._latest is None or monotonic() - self._latest.fetched_at > MAX_AGE:
+                    await self.refresh()
+            latest = self._latest
+
+        return latest
+
+    def last_valid_block_height(self, blockhash: Hash) -> int | None:
+        return self._known.get(blockhash)
+
+    async def block_height(self) -> int:
+        """Current block height taken from the latest blockhash, shared by all readers without a request of its own."""
+        return (await self.get()).last_valid_block_height - VALID_BLOCKS
+
+    async def is_valid(self, blockhash: Hash) -> bool:
+        """Whether a transaction with this blockhash can still land; blockhashes not fetched here are asked with isBlockhashValid."""
+        last_valid_block_height = self._known.get(blockhash)
+        if last_valid_block_height is not None:
+            return await self.block_height() <= last_valid_block_height
+
+        if self._rpc is None:
+            self._rpc = rpc_pool.acquire(endpoint=self.network.endpoint, background=True)
+
+        raw = await self._rpc._provider.make_request_unparsed(RawRequest("isBlockhashValid", [str(blockhash), {"commitment": "processed"}]))
+        return bool(json.loads(raw)["result"]["value"])
+
+    async def refresh(self) -> None:
+        if self._rpc is None:
+            self._rpc = rpc_pool.acquire(endpoint=self.network.endpoint, background=True)
+
+        resp = await self._rpc.get_latest_blockhash()
+        latest = CachedBlockhash(
+            blockhash=resp.value.blockhash,
+            last_valid_block_height=resp.value.last_valid_block_height,
+            fetched_at=monotonic(),
+        )
+        self._latest = latest
+
+        self._known[latest.blockhash] = latest.last_valid_block_height
+        if len(self._known) > KNOWN_BLOCKHASHES:
+            self._known.pop(next(iter(self._known)))
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+        if self._rpc is not None:
+            self._rpc = None
+            await rpc_pool.release(endpoint=self.network.endpoint, background=True)
+
+    def _ensure_refresher(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while monotonic() - self._last_used < IDLE_STOP:
+            await asyncio.sleep(self.refresh_interval)
+
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.debug(f"Blockhash | refresh failed for {self.network.endpoint}: {e}")
+
+
+_caches: dict[str, BlockhashCache] = {}
+
+
+def get_blockhash_cache(network: Network) -> BlockhashCache:
+    cache = _caches.get(network.endpoint)
+    if cache is None:
+        cache = BlockhashCache(network)
+        _caches[network.endpoint] = cache
+    return cache
+
+
+async def close_blockhash_caches() -> None:
+    for endpoint in list(_caches):
+        await _caches.pop(endpoint).close()
@@ -9,18 +9,20 @@ from solders.keypair import Keypair
 
 from libs.sol_async_py.data.models import Network
 from libs.sol_async_py.instructions import Instructions
+from libs.sol_async_py.keypairs import keypair_cache
 from libs.sol_async_py.pda import PDA
+from libs.sol_async_py.rpc_pool import rpc_pool
 from libs.sol_async_py.transactions import Transactions
 from libs.sol_async_py.wallet import Wallet
 from utils.encryption import get_private_key
 
 
 class Client:
-    def __init__(self, private_key, network, proxy=None) -> None:
+    def __init__(self, private_key, network, proxy=None, wallet_id: int | None = None) -> None:
         self.private_key = private_key
         self.proxy = proxy
         self.network: Network = network
-        self.rpc = async_api.AsyncClient(endpoint=self.network.endpoint, proxy=self.proxy)
+        self._rpc: async_api.AsyncClient | None = None
 
         self.solders = solders
         self.solana_py = solana
@@ -29,22 +31,45 @@ class Client:
         self.tx = Transactions(self)
         self.instruct = Instructions(self)
         self.wallet = Wallet(self)
+        # clients of db wallets reuse the keypair parsed in an earlier cycle or action
+        self.account = keypair_cache.get(wallet_id, private_key) if wallet_id is not None else self.load_keypair(private_key)
 
+    @staticmethod
+    def load_keypair(private_key) -> Keypair:
+        """Keypair of a base58, byte-array or encrypted key, or a new one for None; needs no client or network."""
         if isinstance(private_key, str) and re.match("\\[.+]", private_key):
-            self.account = self.parse_private_key_bytes(private_key)
+            return Client.parse_private_key_bytes(private_key)
 
         elif isinstance(private_key, str):
             if "gAAA" in private_key:
-                private_key = get_private_key(private_key)
-            self.account = Keypair.from_base58_string(private_key)
+                # the decrypted key may be a byte array as well
+                return Client.load_keypair(get_private_key(private_key))
+            return Keypair.from_base58_string(private_key)
 
         elif isinstance(private_key, bytes):
-            self.account = Keypair.from_bytes(private_key)
+            return Keypair.from_bytes(private_key)
 
-        else:
-            self.account = Keypair()
+        return Keypair()
 
-    def parse_private_key_bytes(self, key_str: str) -> Keypair:
+    @property
+    def rpc(self) -> async_api.AsyncClient:
+        if self._rpc is None:
+            self._rpc = rpc_pool.acquire(endpoint=self.network.endpoint, proxy=self.proxy)
+        return self._rpc
+
+    async def close(self) -> None:
+        if self._rpc is not None:
+            self._rpc = None
+            await rpc_pool.release(endpoint=self.network.endpoint, proxy=self.proxy)
+
+    async def __aenter__(self) -> "Client":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    @staticmethod
+    def parse_private_key_bytes(key_str: str) -> Keypair:
         raw_string = key_str.strip("[] \t\n")
         number_strings = raw_string.split(",")
         byte_array = []
@@ -53,9 +78,10 @@ class Client:
             byte_array.append(num)
         seed = bytes(byte_array)
 
-        return self.keypair_from_bytes(seed)
+        return Client.keypair_from_bytes(seed)
 
-    def keypair_from_bytes(self, key_64: bytes) -> Keypair:
+    @staticmethod
+    def keypair_from_bytes(key_64: bytes) -> Keypair:
         """
         Аналог Go-функции:
 
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from time import monotonic
+
+from solders.message import Message, MessageV0
+
+from .instructions import CB_PROG, MAX_COMPUTE_UNITS
+
+CACHE_TTL = 600
+MAX_SHAPES = 1024
+# headroom on top of the measured units_consumed when the cached value is used as compute unit limit
+UNITS_MARGIN = 1.2
+# the SetComputeUnitLimit and SetComputeUnitPrice instructions prepended to the measured message burn about 150 CU each
+BUDGET_IX_UNITS = 150
+BUDGET_INSTRUCTIONS = 2
+# a limit below this saves next to nothing on the priority fee and leaves no room for a slightly heavier run
+MIN_UNIT_LIMIT = 1_000
+
+
+@dataclass
+class CachedUnits:
+    units: int
+    measured_at: float
+
+
+class ComputeUnitEstimator:
+    """
+    Caches units_consumed from simulations per instruction shape.
+
+    A shape is the list of non ComputeBudget instructions with their program ids and account layout
+    (pubkey, signer, writable), instruction data is ignored. Repeated swaps with the same accounts
+    reuse the cached estimate and skip simulation until it is older than the TTL.
+    """
+
+    def __init__(self, ttl: float = CACHE_TTL, margin: float = UNITS_MARGIN):
+        self.ttl = ttl
+        self.margin = margin
+        self.hits = 0
+        self.misses = 0
+
+        self._cache: dict[tuple, CachedUnits] = {}
+
+    @staticmethod
+    def shape(message: Message | MessageV0) -> tuple:
+        static_keys = [str(key) for key in message.account_keys]
+        lookups = getattr(message, "address_table_lookups", None) or []
+
+        keys = list(static_keys)
+        for lookup in lookups:
+            keys += [f"{lookup.account_key}:{index}" for index in lookup.writable_indexes]
+        loaded_writable = len(keys)
+        for lookup in lookups:
+            keys += [f"{lookup.account_key}:{index}" for index in lookup.readonly_indexes]
+
+        header = message.header
+        signers = header.num_required_signatures
+
+        def flags(index: int) -> tuple[bool, bool]:
+            if index >= len(static_keys):
+                return False, index < loaded_writable
+            if index < signers:
+                return True, index < signers - header.num_readonly_signed_accounts
+            return False, index < len(static_keys) - header.num_readonly_unsigned_accounts
+
+        shape = []
+        for ix in message.instructions:
+            program = keys[ix.program_id_index]
+            if program == CB_PROG:
+                continue
+            shape.append((program, tuple((keys[index], *flags(index)) for index in bytes(ix.accounts))))
+
+        return tuple(shape)
+
+    def _fresh(self, shape: tuple) -> int | None:
+        cached = self._cache.get(shape)
+        if cached is None or monotonic() - cached.measured_at > self.ttl:
+            return None
+        return cached.units
+
+    def get(self, shape: tuple) -> int | None:
+        """Cached units for the shape, counted towards the hit rate."""
+        units = self._fresh(shape)
+
+        if units is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return units
+
+    def limit_for(self, shape: tuple) -> int | None:
+        """
+        Compute unit limit for the shape: the measured units with the margin, plus the compute budget instructions
+        that may be missing from the simulated message, within MIN_UNIT_LIMIT and MAX_COMPUTE_UNITS.
+        """
+        units = self._fresh(shape)
+        if units is None:
+            return None
+        limit = int(units * self.margin) + BUDGET_IX_UNITS * BUDGET_INSTRUCTIONS
+        return min(max(limit, MIN_UNIT_LIMIT), MAX_COMPUTE_UNITS)
+
+    def forget(self, shape: tuple) -> None:
+        """Drops the estimate of a shape whose transaction failed, the next send simulates it again."""
+        self._cache.pop(shape, None)
+
+    def record(self, shape: tuple, units: int | None) -> None:
+        if not units:
+            return
+
+        self._cache.pop(shape, None)
+        self._cache[shape] = CachedUnits(units=int(units), measured_at=monotonic())
+
+        if len(self._cache) > MAX_SHAPES:
+            self._cache.pop(next(iter(self._cache)))
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {"shapes": len(self._cache), "hits": self.hits, "misses": self.misses, "hit_rate": round(self.hit_rate, 3)}
+
+
+compute_units = ComputeUnitEstimator()
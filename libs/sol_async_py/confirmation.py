@@ -0,0 +1,304 @@
+from __future__ import annotations
+
+import asyncio
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from time import monotonic
+
+from loguru import logger
+from solana.rpc import async_api
+from solana.rpc.websocket_api import SolanaWsClientProtocol, SubscriptionError, connect
+from solders.rpc.responses import SignatureNotification, SubscriptionResult, UnsubscribeResult
+from solders.signature import Signature
+from solders.transaction_status import TransactionConfirmationStatus
+
+from .data.models import Network
+from .rpc_pool import rpc_pool
+
+MAX_SIGNATURES_PER_REQUEST = 256
+MIN_POLL_INTERVAL = 0.4
+MAX_POLL_INTERVAL = 2.0
+MAX_POLL_INTERVAL_WITH_WS = 5.0
+POLL_BACKOFF = 1.5
+WS_RETRY_AFTER = 30
+
+# upper bounds in seconds of the time-to-confirm histogram buckets, the last bucket is open-ended
+CONFIRM_BUCKETS = (0.5, 1, 2, 5, 10, 20, 30, 60)
+
+CONFIRMED_STATUSES = (TransactionConfirmationStatus.Confirmed, TransactionConfirmationStatus.Finalized)
+
+
+@dataclass
+class PendingSignature:
+    future: asyncio.Future
+    added_at: float = field(default_factory=monotonic)
+
+
+class SignatureStatusPoller:
+    """
+    Shared getSignatureStatuses poller for one RPC endpoint.
+
+    Callers add() a signature and await the returned future. All pending signatures are queried together,
+    up to MAX_SIGNATURES_PER_REQUEST per call. The interval drops to min_interval when new signatures
+    arrive or confirmations come in and backs off to max_interval while nothing changes.
+    """
+
+    def __init__(self, network: Network):
+        self.network = network
+        self.min_interval = MIN_POLL_INTERVAL
+        self.max_interval = MAX_POLL_INTERVAL
+        self.interval = MIN_POLL_INTERVAL
+        self.requests = 0
+        self.histogram = [0] * (len(CONFIRM_BUCKETS) + 1)
+
+        self._pending: dict[Signature, PendingSignature] = {}
+        self._task: asyncio.Task | None = None
+        self._rpc: async_api.AsyncClient | None = None
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._pending)
+
+    def add(self, sig: Signature) -> asyncio.Future:
+        pending = self._pending.get(sig)
+        if pending is None:
+            pending = PendingSignature(future=asyncio.get_running_loop().create_future())
+            self._pending[sig] = pending
+            self.interval = self.min_interval
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+        return pending.future
+
+    def discard(self, sig: Signature) -> None:
+        self._pending.pop(sig, None)
+
+    def resolve(self, sig: Signature, err) -> bool:
+        pending = self._pending.pop(sig, None)
+        if pending is None or pending.future.done():
+            return False
+
+        self.histogram[bisect_left(CONFIRM_BUCKETS, monotonic() - pending.added_at)] += 1
+
+        if err is None:
+            pending.future.set_result(TransactionConfirmationStatus.Confirmed)
+        else:
+            pending.future.set_exception(Exception(err))
+        return True
+
+    def stats(self) -> dict:
+        labels = [f"<={bucket}s" for bucket in CONFIRM_BUCKETS] + [f">{CONFIRM_BUCKETS[-1]}s"]
+        return {
+            "queue_depth": self.queue_depth,
+            "requests": self.requests,
+            "interval": round(self.interval, 2),
+            "time_to_confirm": dict(zip(labels, self.histogram)),
+        }
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+
+        if self._rpc is not None:
+            self._rpc = None
+            await rpc_pool.release(endpoint=self.network.endpoint, background=True)
+
+    async def _run(self) -> None:
+        while self._pending:
+            await asyncio.sleep(self.interval)
+
+            resolved = await self.poll()
+            if resolved:
+                self.interval = self.min_interval
+            else:
+                self.interval = min(self.interval * POLL_BACKOFF, self.max_interval)
+
+    async def poll(self) -> int:
+        if self._rpc is None:
+            self._rpc = rpc_pool.acquire(endpoint=self.network.endpoint, background=True)
+
+        resolved = 0
+        signatures = list(self._pending)
+
+        for i in range(0, len(signatures), MAX_SIGNATURES_PER_REQUEST):
+            chunk = signatures[i : i + MAX_SIGNATURES_PER_REQUEST]
+            try:
+                resp = await self._rpc.get_signature_statuses(chunk, search_transaction_history=True)
+                self.requests += 1
+            except Exception as e:
+                logger.debug(f"Confirmation | getSignatureStatuses failed: {e}")
+                continue
+
+            for sig, status in zip(chunk, resp.value):
+                if status is None:
+                    continue
+                if status.err is not None:
+                    resolved += self.resolve(sig, status.err)
+                elif status.confirmation_status in CONFIRMED_STATUSES:
+                    resolved += self.resolve(sig, None)
+
+        return resolved
+
+
+class ConfirmationEngine:
+    """
+    Waits for transaction confirmations of all wallets on one RPC endpoint.
+
+    Every signature is subscribed over a single shared signatureSubscribe websocket and registered with
+    the endpoint's SignatureStatusPoller. While the websocket is up the poller only runs as a slow safety net
+    for transactions that landed before their subscription; without it the poller does all the work.
+    A subscription that did not end with its notification is unsubscribed when the wait is over.
+    """
+
+    def __init__(self, network: Network):
+        self.network = network
+        self.poller = SignatureStatusPoller(network)
+
+        self._ws: SolanaWsClientProtocol | None = None
+        self._ws_task: asyncio.Task | None = None
+        self._ws_failed_at: float | None = None
+        self._ws_lock = asyncio.Lock()
+        self._waiting: set[Signature] = set()
+        # subscription ids of the waited signatures on the current websocket, the server drops one after its notification
+        self._subscriptions: dict[Signature, int] = {}
+
+    async def wait(self, sig: Signature | str, timeout: int = 60) -> TransactionConfirmationStatus:
+        if isinstance(sig, str):
+            sig = Signature.from_string(sig)
+
+        future = self.poller.add(sig)
+        self._waiting.add(sig)
+        await self._subscribe(sig)
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+
+        except asyncio.TimeoutError:
+            raise Exception(f"[TX {sig}] timeout after {timeout} sec")
+
+        finally:
+            self.poller.discard(sig)
+            self._waiting.discard(sig)
+            subscription = self._subscriptions.pop(sig, None)
+            if subscription is not None and self._ws is not None:
+                await self._unsubscribe(self._ws, subscription)
+
+    def stats(self) -> dict:
+        return {"websocket": self._ws is not None, **self.poller.stats()}
+
+    async def close(self) -> None:
+        if self._ws_task is not None:
+            self._ws_task.cancel()
+
+        if self._ws is not None:
+            await self._ws.close()
+            self._ws = None
+
+        await self.poller.close()
+
+    def _set_ws(self, ws: SolanaWsClientProtocol | None) -> None:
+        self._ws = ws
+        if ws is not None:
+            self.poller.min_interval = self.poller.max_interval = MAX_POLL_INTERVAL_WITH_WS
+        else:
+            self.poller.min_interval, self.poller.max_interval = MIN_POLL_INTERVAL, MAX_POLL_INTERVAL
+
+    async def _connect(self) -> SolanaWsClientProtocol | None:
+        if self._ws is not None:
+            return self._ws
+
+        async with self._ws_lock:
+            retry_later = self._ws_failed_at is not None and monotonic() - self._ws_failed_at < WS_RETRY_AFTER
+
+            if self._ws is None and not retry_later:
+                try:
+                    ws = await connect(self.network.ws_endpoint)
+                    self._set_ws(ws)
+                    self._ws_task = asyncio.create_task(self._read_ws(ws))
+
+                except Exception as e:
+                    self._ws_failed_at = monotonic()
+                    logger.debug(f"Confirmation | websocket {self.network.ws_endpoint} unavailable, polling only: {e}")
+
+        return self._ws
+
+    async def _subscribe(self, sig: Signature) -> None:
+        ws = await self._connect()
+        if ws is None:
+            return
+
+        try:
+            await ws.signature_subscribe(sig, commitment="confirmed")
+        except Exception as e:
+            logger.debug(f"Confirmation | signatureSubscribe failed for {sig}: {e}")
+
+    async def _unsubscribe(self, ws: SolanaWsClientProtocol, subscription: int) -> None:
+        try:
+            await ws.signature_unsubscribe(subscription)
+        except Exception as e:
+            # the notification may have removed it meanwhile
+            logger.debug(f"Confirmation | signatureUnsubscribe failed for subscription {subscription}: {e}")
+
+    async def _read_ws(self, ws: SolanaWsClientProtocol) -> None:
+        try:
+            while True:
+                try:
+                    messages = await ws.recv()
+                except SubscriptionError as e:
+                    ws.sent_subscriptions.pop(e.subscription.id, None)
+                    ws.failed_subscriptions.pop(e.subscription.id, None)
+                    logger.debug(f"Confirmation | {e}")
+                    continue
+
+                for message in messages:
+                    if isinstance(message, SubscriptionResult):
+                        request = ws.sent_subscriptions.pop(message.id, None)
+                        sig = getattr(request, "signature", None)
+                        if sig in self._waiting:
+                            self._subscriptions[sig] = message.result
+                        elif sig is not None:
+                            # confirmed by the poller or timed out before the subscription was acknowledged
+                            await self._unsubscribe(ws, message.result)
+
+                    elif isinstance(message, UnsubscribeResult):
+                        ws.sent_subscriptions.pop(message.id, None)
+
+                    elif isinstance(message, SignatureNotification):
+                        request = ws.subscriptions.pop(message.subscription, None)
+                        if request is not None:
+                            self._subscriptions.pop(request.signature, None)
+                            self.poller.resolve(request.signature, message.result.value.err)
+
+        except asyncio.CancelledError:
+            raise
+
+        except Exception as e:
+            logger.debug(f"Confirmation | websocket closed: {e}")
+
+        finally:
+            if self._ws is ws:
+                self._set_ws(None)
+                self._ws_failed_at = monotonic()
+                # subscriptions end with their websocket
+                self._subscriptions.clear()
+
+
+_engines: dict[str, ConfirmationEngine] = {}
+
+
+def get_confirmation_engine(network: Network) -> ConfirmationEngine:
+    engine = _engines.get(network.endpoint)
+    if engine is None:
+        engine = ConfirmationEngine(network)
+        _engines[network.endpoint] = engine
+    return engine
+
+
+def confirmation_stats() -> dict:
+    return {endpoint: engine.stats() for endpoint, engine in _engines.items()}
+
+
+async def close_confirmation_engines() -> None:
+    for endpoint in list(_engines):
+        await _engines.pop(endpoint).close()
@@ -50,9 +50,11 @@ class Network:
         endpoint: str,
         decimals: int,
         explorer: str | None = None,
+        ws_endpoint: str | None = None,
     ) -> None:
         self.name: str = name.lower()
         self.endpoint: str = endpoint
+        self.ws_endpoint: str = ws_endpoint or endpoint.replace("https://", "wss://", 1).replace("http://", "ws://", 1)
         self.explorer: str | None = explorer
         self.decimals: int = decimals
 
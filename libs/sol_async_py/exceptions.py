@@ -18,6 +18,10 @@ class TransactionException(Exception):
     pass
 
 
+class BlockhashExpired(TransactionException):
+    pass
+
+
 class GasPriceTooHigh(Exception):
     pass
 
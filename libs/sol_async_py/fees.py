@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from math import ceil
+from time import monotonic
+
+from loguru import logger
+from solana.rpc import async_api
+from solders.pubkey import Pubkey
+
+from .data.models import Network
+from .rpc_pool import RawRequest, rpc_pool
+
+SAMPLE_TTL = 10
+# getRecentPrioritizationFees returns up to 150 slots per call, the window keeps the latest WINDOW_SLOTS of them
+WINDOW_SLOTS = 600
+MAX_ACCOUNTS_PER_REQUEST = 128
+MAX_WINDOWS = 256
+# windows nobody priced a transaction with for IDLE_STOP seconds are dropped, the refresher stops without windows
+IDLE_STOP = 120
+DEFAULT_PERCENTILE = 50
+
+
+class PriorityFeeOracle:
+    """
+    Compute unit prices paid recently on one RPC endpoint.
+
+    Fees are sampled with getRecentPrioritizationFees for the shared writable accounts of a transaction and kept
+    in a rolling per-slot window for every account set. Only the first transaction of an account set waits for a
+    sample. After that a single background task resamples the windows read within IDLE_STOP seconds every
+    SAMPLE_TTL, so pricing a transaction reads the window without a network call. Each account set has its own
+    lock, so a slow sample never holds back unrelated ones.
+    """
+
+    def __init__(self, network: Network, ttl: float = SAMPLE_TTL, window_slots: int = WINDOW_SLOTS):
+        self.network = network
+        self.ttl = ttl
+        self.window_slots = window_slots
+        self.requests = 0
+
+        self._windows: dict[frozenset[str], dict[int, int]] = {}
+        self._sampled_at: dict[frozenset[str], float] = {}
+        self._last_used: dict[frozenset[str], float] = {}
+        self._locks: dict[frozenset[str], asyncio.Lock] = {}
+        self._rpc: async_api.AsyncClient | None = None
+        self._task: asyncio.Task | None = None
+
+    @staticmethod
+    def percentile(values: list[int], percentile: float) -> int:
+        if not values:
+            return 0
+
+        ordered = sorted(values)
+        rank = ceil(len(ordered) * min(max(percentile, 0), 100) / 100)
+        return ordered[max(rank, 1) - 1]
+
+    async def fee_for(self, percentile: float = DEFAULT_PERCENTILE, accounts: list[Pubkey | str] | None = None) -> int:
+        """Compute unit price in micro-lamports at the given percentile of the recent fees for the accounts."""
+        key = frozenset(str(account) for account in (accounts or [])[:MAX_ACCOUNTS_PER_REQUEST])
+        self._last_used[key] = monotonic()
+        self._ensure_refresher()
+
+        if key not in self._windows:
+            # concurrent first readers wait on the lock for the same sample
+            await self._sample_once(key)
+
+        return self.percentile(list(self._windows.get(key, {}).values()), percentile)
+
+    async def _sample_once(self, key: frozenset[str]) -> None:
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            if monotonic() - self._sampled_at.get(key, 0) > self.ttl:
+                await self.sample(key)
+
+    async def sample(self, key: frozenset[str]) -> None:
+        if self._rpc is None:
+            self._rpc = rpc_pool.acquire(endpoint=self.network.endpoint, background=True)
+
+        # a failed sample keeps the previous window and is retried after the TTL
+        self._sampled_at[key] = monotonic()
+
+        try:
+            raw = await self._rpc._provider.make_request_unparsed(RawRequest("getRecentPrioritizationFees", [sorted(key)]))
+            self.requests += 1
+            result = json.loads(raw)["result"]
+        except Exception as e:
+            logger.debug(f"Fees | getRecentPrioritizationFees failed for {self.network.endpoint}: {e}")
+            return
+
+        window = self._windows.pop(key, {})
+        window.update({item["slot"]: item["prioritizationFee"] for item in result})
+        for slot in sorted(window)[: -self.window_slots]:
+            del window[slot]
+        self._windows[key] = window
+
+        if len(self._windows) > MAX_WINDOWS:
+            self._forget(next(iter(self._windows)))
+
+    def _forget(self, key: frozenset[str]) -> None:
+        self._windows.pop(key, None)
+        self._sampled_at.pop(key, None)
+        self._last_used.pop(key, None)
+        self._locks.pop(key, None)
+
+    def _ensure_refresher(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.ttl)
+
+            now = monotonic()
+            for key in [key for key, used in self._last_used.items() if now - used > IDLE_STOP]:
+                self._forget(key)
+            if not self._last_used:
+                return
+
+            stale = [key for key in self._last_used if now - self._sampled_at.get(key, 0) > self.ttl]
+            # sample() logs its own failures and keeps the previous window
+            await asyncio.gather(*(self._sample_once(key) for key in stale), return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {"windows": len(self._windows), "requests": self.requests}
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+        if self._rpc is not None:
+            self._rpc = None
+            await rpc_pool.release(endpoint=self.network.endpoint, background=True)
+
+
+_oracles: dict[str, PriorityFeeOracle] = {}
+
+
+def get_fee_oracle(network: Network) -> PriorityFeeOracle:
+    oracle = _oracles.get(network.endpoint)
+    if oracle is None:
+        oracle = PriorityFeeOracle(network)
+        _oracles[network.endpoint] = oracle
+    return oracle
+
+
+async def close_fee_oracles() -> None:
+    for endpoint in list(_oracles):
+        await _oracles.pop(endpoint).close()
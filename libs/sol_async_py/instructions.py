@@ -8,6 +8,8 @@ from solders.instruction import AccountMeta, CompiledInstruction, Instruction
 from solders.message import Message, MessageV0
 from solders.pubkey import Pubkey
 
+from .fees import DEFAULT_PERCENTILE, get_fee_oracle
+
 if TYPE_CHECKING:
     from .client import Client
 
@@ -18,6 +20,11 @@ MICRO = 1_000_000
 CB_PROG = "ComputeBudget111111111111111111111111111111"
 TAG_SET_CU_LIMIT = 2
 TAG_SET_CU_PRICE = 3
+# compute units the runtime assumes per instruction when no limit is set
+DEFAULT_UNITS_PER_IX = 200_000
+MAX_COMPUTE_UNITS = 1_400_000
+# upper bound of the priority fee of one transaction
+MAX_PRIORITY_FEE_SOL = 0.0005
 
 
 @dataclass
@@ -51,7 +58,8 @@ class Instructions:
         )
 
     @staticmethod
-    def compile_compute_unit_price(micro_lamports: int = 476_994, prog_index: int = 1) -> CompiledInstruction:
+    def compile_compute_unit_price(micro_lamports: int, prog_index: int = 1) -> CompiledInstruction:
+        """The price comes from priority_fee() or compile_priced_compute_unit_price(), there is no fixed default."""
         data = bytes([3]) + micro_lamports.to_bytes(8, "little")  # tag=3, u64 price
 
         return CompiledInstruction(
@@ -86,7 +94,11 @@ class Instructions:
 
         return self.calc_max_fee(limit, price)
 
-    def calc_max_fee(self, limit: int, price: int) -> ComputeBudgetInfo:
+    def calc_max_fee(self, limit: int, price: int, cap_sol: float | None = None) -> ComputeBudgetInfo:
+        """With cap_sol the price is lowered so that limit * price never costs more than cap_sol."""
+        if cap_sol is not None and limit > 0:
+            price = min(price, int(cap_sol * LAMPORTS_PER_SOL) * MICRO // limit)
+
         max_fee_sol = 0.0
         if price > 0 and limit > 0:
             fee_lamports = limit * price // 1_000_000
@@ -94,6 +106,28 @@ class Instructions:
 
         return ComputeBudgetInfo(limit=limit, price=price, max_fee_sol=max_fee_sol)
 
+    async def priority_fee(
+        self,
+        limit: int,
+        accounts: list[Pubkey] | None = None,
+        percentile: float = DEFAULT_PERCENTILE,
+        cap_sol: float | None = MAX_PRIORITY_FEE_SOL,
+    ) -> ComputeBudgetInfo:
+        """Compute budget priced from the recent fees paid for the accounts, capped at cap_sol per transaction."""
+        price = await get_fee_oracle(self.client.network).fee_for(percentile=percentile, accounts=accounts)
+        return self.calc_max_fee(limit, price, cap_sol=cap_sol)
+
+    async def compile_priced_compute_unit_price(
+        self,
+        limit: int,
+        accounts: list[Pubkey] | None = None,
+        percentile: float = DEFAULT_PERCENTILE,
+        prog_index: int = 1,
+    ) -> CompiledInstruction:
+        """Compiled SetComputeUnitPrice priced like prepare_tx does, from the fee oracle and capped by calc_max_fee."""
+        priority = await self.priority_fee(limit, accounts=accounts, percentile=percentile)
+        return self.compile_compute_unit_price(priority.price, prog_index=prog_index)
+
     def _parse_compute_budget(self, ix: CompiledInstruction, account_keys: list[Pubkey]) -> Optional[dict]:
         program_id = account_keys[ix.program_id_index]
 
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from time import monotonic
+
+from solders.keypair import Keypair
+
+# longer than the 12-24h cycle of repeating actions, so every cycle of a wallet reuses its keypair
+KEYPAIR_TTL = 48 * 3600
+MAX_KEYPAIRS = 10_000
+
+
+@dataclass
+class CachedKeypair:
+    keypair: Keypair
+    private_key: str
+    loaded_at: float
+
+
+class KeypairCache:
+    """
+    Parsed keypairs by wallet id, shared by all actions of the process.
+
+    An entry is reused while the stored private key of the wallet is unchanged and it is younger than the TTL,
+    the least recently used wallets are dropped beyond `max_size`. A miss decrypts and parses the key with
+    Client.load_keypair.
+    """
+
+    def __init__(self, ttl: float = KEYPAIR_TTL, max_size: int = MAX_KEYPAIRS):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._cache: OrderedDict[int, CachedKeypair] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, wallet_id: int, private_key: str) -> Keypair:
+        with self._lock:
+            cached = self._cache.get(wallet_id)
+            if cached is not None and cached.private_key == private_key and monotonic() - cached.loaded_at <= self.ttl:
+                self._cache.move_to_end(wallet_id)
+                self.hits += 1
+                return cached.keypair
+            self.misses += 1
+
+        from .client import Client
+
+        keypair = Client.load_keypair(private_key)
+
+        with self._lock:
+            self._cache.pop(wallet_id, None)
+            self._cache[wallet_id] = CachedKeypair(keypair=keypair, private_key=private_key, loaded_at=monotonic())
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+                self.evictions += 1
+
+        return keypair
+
+    def forget(self, wallet_id: int) -> None:
+        with self._lock:
+            self._cache.pop(wallet_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "keypairs": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+keypair_cache = KeypairCache()
@@ -1,48 +1,106 @@
 from __future__ import annotations
 
+import threading
+from collections import OrderedDict
 from typing import TYPE_CHECKING, List, Tuple
 
 from solders.pubkey import Pubkey
+from spl.token.constants import ASSOCIATED_TOKEN_PROGRAM_ID, TOKEN_PROGRAM_ID
 
 if TYPE_CHECKING:
     from .client import Client
 
+# a fleet of 10k wallets with a few tokens each stays well below this
+MAX_DERIVATIONS = 65_536
 
-class PDA:
-    def __init__(self, client: Client):
-        self.client = client
 
-    async def find_program_address(self, seeds: List[bytes], program_id: str) -> Tuple[Pubkey, int]:
-        """
-        Аналог Go-функции FindProgramAddress, перебирающей nonce от 255 до 0,
-        пока не удастся создать программно-производный адрес (PDA).
-        Возвращает (pda, nonce), либо бросает ValueError, если PDA найти не удалось.
-        """
-        nonce = 0xFF  # начинаем с 255
-        bytes_seeds = []
-        for seed in seeds:
-            if isinstance(seed, str):
-                s = seed.encode()
-            else:
-                s = bytes(seed)
-            bytes_seeds.append(s)
+class DerivationCache:
+    """
+    Program derived addresses and their bumps by (seeds, program id), shared by the whole process.
+
+    Owner, mint and token program of a wallet never change, so every ATA is hashed once and later
+    lookups are a dict hit. The least recently used derivations are dropped beyond `max_size`.
+    """
+
+    def __init__(self, max_size: int = MAX_DERIVATIONS):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+        self._cache: OrderedDict[tuple[tuple[bytes, ...], Pubkey], Tuple[Pubkey, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def find_program_address(self, seeds: tuple[bytes, ...], program_id: Pubkey) -> Tuple[Pubkey, int]:
+        key = (seeds, program_id)
+        with self._lock:
+            derived = self._cache.get(key)
+            if derived is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return derived
+            self.misses += 1
+
+        derived = derive_program_address(seeds, program_id)
+
+        with self._lock:
+            self._cache[key] = derived
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+        return derived
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
 
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "derivations": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+def derive_program_address(seeds: tuple[bytes, ...], program_id: Pubkey) -> Tuple[Pubkey, int]:
+    """Tries the bumps from 255 down to 0 until the address is off the curve, like FindProgramAddress in Go."""
+    for bump in range(0xFF, -1, -1):
+        try:
+            return Pubkey.create_program_address([*seeds, bytes([bump])], program_id), bump
+        except Exception:
+            # create_program_address raises for bumps that land on the curve
+            continue
+
+    raise ValueError("unable to find a viable program address")
+
+
+derivations = DerivationCache()
+
+
+def find_program_address(seeds: List[bytes | str | Pubkey], program_id: str | Pubkey) -> Tuple[Pubkey, int]:
+    """Cached (pda, bump) of the seeds, str seeds are utf-8 encoded."""
+    if isinstance(program_id, str):
         program_id = Pubkey.from_string(program_id)
+    seeds = tuple(seed.encode() if isinstance(seed, str) else bytes(seed) for seed in seeds)
+    return derivations.find_program_address(seeds, program_id)
 
-        while True:
-            # Формируем полный список сидов: исходные + байт с nonce
-            all_seeds = bytes_seeds + [bytes([nonce])]
-            try:
-                # Пытаемся создать PDA
-                pda = Pubkey.create_program_address(all_seeds, program_id)
-                return pda
 
-            except Exception:
-                # create_program_address бросит ошибку, если nonce не подходит
-                pass
+def get_associated_token_address(wallet_address: Pubkey, token_mint_address: Pubkey, token_program_id: Pubkey = TOKEN_PROGRAM_ID) -> Pubkey:
+    """Cached drop-in for solders/spl get_associated_token_address."""
+    ata, _ = derivations.find_program_address(
+        (bytes(wallet_address), bytes(token_program_id), bytes(token_mint_address)), ASSOCIATED_TOKEN_PROGRAM_ID
+    )
+    return ata
 
-            if nonce == 0:
-                break
-            nonce -= 1
 
-        raise ValueError("unable to find a viable program address")
+class PDA:
+    def __init__(self, client: Client):
+        self.client = client
+
+    async def find_program_address(self, seeds: List[bytes | str | Pubkey], program_id: str | Pubkey) -> Tuple[Pubkey, int]:
+        """
+        Program derived address of the seeds and the bump it was found with, from the process-wide cache.
+        Raises ValueError if no bump from 255 to 0 gives an address off the curve.
+        """
+        return find_program_address(seeds, program_id)
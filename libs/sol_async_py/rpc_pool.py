@@ -0,0 +1,107 @@
+import json
+from dataclasses import dataclass
+
+from loguru import logger
+from solana.rpc import async_api
+from solana.rpc.providers.async_http import AsyncHTTPProvider
+
+from .rpc_router import RateLimitedProvider, RoutedProvider, rpc_router
+
+
+class RawRequest:
+    """JSON-RPC body for methods without a solders request type, sent through the provider like any other call."""
+
+    def __init__(self, method: str, params: list):
+        self.method = method
+        self.params = params
+
+    def to_json(self) -> str:
+        return json.dumps({"jsonrpc": "2.0", "id": 1, "method": self.method, "params": self.params})
+
+
+class ProviderAsyncClient(async_api.AsyncClient):
+    """AsyncClient over a ready provider, AsyncClient.__init__ would open an httpx client of its own first."""
+
+    def __init__(self, provider: AsyncHTTPProvider):
+        super(async_api.AsyncClient, self).__init__()
+        self._provider = provider
+
+
+@dataclass
+class PooledClient:
+    rpc: async_api.AsyncClient
+    references: int = 0
+
+
+class RpcClientPool:
+    """
+    Process-wide registry of solana AsyncClient transports.
+
+    Clients with the same (endpoint, proxy, background) share one AsyncClient and its HTTP connection pool.
+    Every acquire() must be paired with release(); the transport is closed when the last reference is gone.
+
+    Background clients serve the shared refreshers of an endpoint (blockhash cache, confirmation poller, fee oracle).
+    Their traffic does not depend on the number of wallets and is left out of the rpc rate limit, which is the
+    budget of the wallets' own requests.
+    """
+
+    def __init__(self):
+        self._clients: dict[tuple[str, str | None, bool], PooledClient] = {}
+
+    def acquire(self, endpoint: str, proxy: str | None = None, background: bool = False) -> async_api.AsyncClient:
+        key = (endpoint, proxy, background)
+        pooled = self._clients.get(key)
+
+        if pooled is None:
+            endpoints = rpc_router.endpoints_for(endpoint)
+            if len(endpoints) > 1:
+                provider = RoutedProvider(endpoints, proxy=proxy, rate_limited=not background)
+            else:
+                provider = RateLimitedProvider(endpoint, proxy=proxy, rate_limited=not background)
+            pooled = PooledClient(rpc=ProviderAsyncClient(provider))
+            self._clients[key] = pooled
+
+        pooled.references += 1
+        return pooled.rpc
+
+    async def release(self, endpoint: str, proxy: str | None = None, background: bool = False) -> None:
+        key = (endpoint, proxy, background)
+        pooled = self._clients.get(key)
+        if pooled is None:
+            return
+
+        pooled.references -= 1
+        if pooled.references <= 0:
+            await self._close(key)
+
+    async def close_all(self) -> None:
+        for key in list(self._clients):
+            await self._close(key)
+
+    @staticmethod
+    def _open_connections(rpc: async_api.AsyncClient) -> int:
+        connections = 0
+        for provider in getattr(rpc._provider, "providers", [rpc._provider]):
+            pool = getattr(getattr(provider.session, "_transport", None), "_pool", None)
+            connections += len(getattr(pool, "connections", []))
+        return connections
+
+    def stats(self) -> dict:
+        return {
+            "transports": len(self._clients),
+            "references": sum(pooled.references for pooled in self._clients.values()),
+            "open_connections": sum(self._open_connections(pooled.rpc) for pooled in self._clients.values()),
+        }
+
+    async def _close(self, key: tuple[str, str | None, bool]) -> None:
+        pooled = self._clients.pop(key, None)
+        if pooled is None:
+            return
+
+        try:
+            await pooled.rpc.close()
+        except Exception as e:
+            logger.debug(f"RPC pool | failed to close transport for {key[0]}: {e}")
+
+
+rpc_pool = RpcClientPool()
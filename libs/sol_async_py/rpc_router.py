@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+from loguru import logger
+from solana.rpc.providers.async_http import AsyncHTTPProvider
+from solders.rpc.requests import SendLegacyTransaction, SendRawTransaction, SendVersionedTransaction
+
+from data.rpc import RPC_MAP
+from data.settings import Settings
+from utils.rate_limiter import rate_limiter
+
+EWMA_ALPHA = 0.2
+LATENCY_WINDOW = 100
+# an error rate of 1.0 makes an endpoint look ERROR_PENALTY + 1 times slower than its latency
+ERROR_PENALTY = 10
+# slow reads are hedged with the next endpoint after the p95 latency of the best one, bounded by these values
+MIN_HEDGE_DELAY = 0.05
+DEFAULT_HEDGE_DELAY = 0.5
+MAX_HEDGE_DELAY = 2.0
+BROADCAST_FANOUT = 3
+
+SEND_REQUESTS = (SendLegacyTransaction, SendRawTransaction, SendVersionedTransaction)
+
+
+@dataclass
+class EndpointHealth:
+    latency: float | None = None
+    error_rate: float = 0.0
+    requests: int = 0
+    errors: int = 0
+    samples: deque = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW))
+
+    def record(self, latency: float, ok: bool) -> None:
+        self.requests += 1
+        self.error_rate += EWMA_ALPHA * ((0.0 if ok else 1.0) - self.error_rate)
+
+        if not ok:
+            self.errors += 1
+            return
+
+        self.samples.append(latency)
+        self.latency = latency if self.latency is None else self.latency + EWMA_ALPHA * (latency - self.latency)
+
+    @property
+    def score(self) -> float:
+        # endpoints without samples score 0 so they get probed first
+        return (self.latency or 0.0) * (1 + ERROR_PENALTY * self.error_rate)
+
+    def p95(self) -> float | None:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]
+
+
+class RpcRouter:
+    """
+    Health of every RPC endpoint in the process, shared by all pooled clients regardless of their proxy.
+
+    An endpoint from data/rpc.py is extended with the endpoints listed for the same network in the
+    rpc_endpoints settings; clients of such a network get a RoutedProvider over the whole list.
+    """
+
+    def __init__(self):
+        self._health: dict[str, EndpointHealth] = {}
+
+    def health(self, endpoint: str) -> EndpointHealth:
+        health = self._health.get(endpoint)
+        if health is None:
+            health = EndpointHealth()
+            self._health[endpoint] = health
+        return health
+
+    @staticmethod
+    def endpoints_for(endpoint: str) -> list[str]:
+        names = [name for name, url in RPC_MAP.items() if url == endpoint]
+        extra = Settings().rpc_endpoints.get(names[0], []) if names else []
+        return [endpoint] + [url for url in extra or [] if url != endpoint]
+
+    def rank(self, providers: list[RateLimitedProvider]) -> list[RateLimitedProvider]:
+        return sorted(providers, key=lambda provider: self.health(provider.endpoint).score)
+
+    def hedge_delay(self, endpoint: str) -> float:
+        p95 = self.health(endpoint).p95()
+        if p95 is None:
+            return DEFAULT_HEDGE_DELAY
+        return min(max(p95, MIN_HEDGE_DELAY), MAX_HEDGE_DELAY)
+
+    def stats(self) -> dict:
+        return {
+            endpoint: {
+                "latency": round(health.latency, 3) if health.latency is not None else None,
+                "error_rate": round(health.error_rate, 3),
+                "requests": health.requests,
+                "errors": health.errors,
+            }
+            for endpoint, health in self._health.items()
+        }
+
+
+rpc_router = RpcRouter()
+
+
+class RateLimitedProvider(AsyncHTTPProvider):
+    """
+    AsyncHTTPProvider that takes a token from the endpoint and proxy buckets before every HTTP request,
+    unless it carries background traffic with rate_limited=False.
+    """
+
+    def __init__(self, endpoint: str, proxy: str | None = None, rate_limited: bool = True, **kwargs):
+        super().__init__(endpoint, proxy=proxy, **kwargs)
+        self.endpoint = endpoint
+        self.proxy = proxy
+        self.rate_limited = rate_limited
+
+    async def make_request_unparsed(self, body) -> str:
+        if self.rate_limited:
+            await rate_limiter.acquire(rpc=self.endpoint, proxy=self.proxy)
+        return await super().make_request_unparsed(body)
+
+    async def make_batch_request_unparsed(self, reqs) -> str:
+        if self.rate_limited:
+            await rate_limiter.acquire(rpc=self.endpoint, proxy=self.proxy)
+        return await super().make_batch_request_unparsed(reqs)
+
+
+class RoutedProvider(RateLimitedProvider):
+    """
+    Provider over several endpoints of one network, the first one is this provider itself.
+
+    Reads go to the endpoint with the best latency/error score and are hedged with the next one when
+    they take longer than the p95 latency of the best endpoint; failed reads fail over immediately.
+    Transactions are broadcast to the BROADCAST_FANOUT best endpoints and the first accepted signature wins.
+    """
+
+    def __init__(self, endpoints: list[str], proxy: str | None = None, router: RpcRouter | None = None, rate_limited: bool = True):
+        super().__init__(endpoints[0], proxy=proxy, rate_limited=rate_limited)
+        self.router = router or rpc_router
+        self.providers: list[RateLimitedProvider] = [self] + [
+            RateLimitedProvider(endpoint, proxy=proxy, rate_limited=rate_limited) for endpoint in endpoints[1:]
+        ]
+        self._broadcasts: set[asyncio.Task] = set()
+
+    async def make_request_unparsed(self, body) -> str:
+        call = lambda provider: RateLimitedProvider.make_request_unparsed(provider, body)  # noqa: E731
+
+        if isinstance(body, SEND_REQUESTS):
+            return await self._broadcast(call)
+        return await self._hedged(call)
+
+    async def make_batch_request_unparsed(self, reqs) -> str:
+        return await self._hedged(lambda provider: RateLimitedProvider.make_batch_request_unparsed(provider, reqs))
+
+    async def close(self) -> None:
+        for task in self._broadcasts:
+            task.cancel()
+        for provider in self.providers[1:]:
+            await provider.close()
+        await super().close()
+
+    def _forget(self, task: asyncio.Task) -> None:
+        self._broadcasts.discard(task)
+        if not task.cancelled():
+            task.exception()
+
+    async def _timed(self, provider: RateLimitedProvider, call: Callable[[RateLimitedProvider], Awaitable[str]]) -> str:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        health = self.router.health(provider.endpoint)
+
+        try:
+            result = await call(provider)
+        except Exception:
+            health.record(loop.time() - started, ok=False)
+            raise
+
+        health.record(loop.time() - started, ok=True)
+        return result
+
+    async def _hedged(self, call: Callable[[RateLimitedProvider], Awaitable[str]]) -> str:
+        ranked = self.router.rank(self.providers)
+        delay = self.router.hedge_delay(ranked[0].endpoint)
+        tasks: set[asyncio.Task] = set()
+        error: Exception | None = None
+
+        try:
+            for index, provider in enumerate(ranked):
+                tasks.add(asyncio.create_task(self._timed(provider, call)))
+                last = index == len(ranked) - 1
+
+                while tasks:
+                    done, tasks = await asyncio.wait(tasks, timeout=None if last else delay, return_when=asyncio.FIRST_COMPLETED)
+                    if not done:
+                        # slow read, hedge with the next endpoint
+                        break
+
+                    for task in done:
+                        if task.exception() is None:
+                            return task.result()
+                        error = task.exception()
+
+                    if not last:
+                        # failed read, fail over to the next endpoint
+                        break
+
+            raise error
+
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _broadcast(self, call: Callable[[RateLimitedProvider], Awaitable[str]]) -> str:
+        targets = self.router.rank(self.providers)[:BROADCAST_FANOUT]
+        tasks = [asyncio.create_task(self._timed(provider, call)) for provider in targets]
+
+        # the slower sends keep running after the first answer, cancelling them could drop a transaction halfway
+        self._broadcasts.update(tasks)
+        for task in tasks:
+            task.add_done_callback(self._forget)
+
+        rejected: str | None = None
+        error: Exception | None = None
+
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                result = await next_done
+            except Exception as e:
+                error = e
+                logger.debug(f"RPC router | sendTransaction failed on one endpoint: {e}")
+                continue
+
+            try:
+                accepted = "error" not in json.loads(result)
+            except ValueError as e:
+                error = e
+                logger.debug(f"RPC router | sendTransaction got an invalid answer from one endpoint: {result[:200]}")
+                continue
+
+            if accepted:
+                return result
+            rejected = rejected or result
+
+        if rejected is not None:
+            return rejected
+        raise error
@@ -1,23 +1,69 @@
 from __future__ import annotations
 
 import asyncio
-from time import time
 from typing import TYPE_CHECKING
 
+from loguru import logger
 from solana.rpc.types import TxOpts
 from solders.message import MessageV0
 from solders.pubkey import Pubkey
+from solders.signature import Signature
 from solders.transaction import VersionedTransaction
 from solders.transaction_status import TransactionConfirmationStatus
-from spl.token.instructions import get_associated_token_address
+from spl.token.constants import ASSOCIATED_TOKEN_PROGRAM_ID, TOKEN_2022_PROGRAM_ID, TOKEN_PROGRAM_ID
 
+from .blockhash import get_blockhash_cache
+from .compute_units import compute_units
+from .confirmation import get_confirmation_engine
 from .data.models import RawContract
+from .exceptions import BlockhashExpired
+from .fees import DEFAULT_PERCENTILE
+from .instructions import COMPUTE_BUDGET, DEFAULT_UNITS_PER_IX, MAX_COMPUTE_UNITS, TAG_SET_CU_LIMIT, TAG_SET_CU_PRICE, Instructions
+from .pda import derive_program_address, get_associated_token_address
 
 if TYPE_CHECKING:
     from .client import Client
 
 
 MICRO = 1_000_000
+# the signed transaction is resent every REBROADCAST_INTERVAL seconds until it confirms or its blockhash expires
+REBROADCAST_INTERVAL = 2.0
+# rounds between isBlockhashValid checks of blockhashes the blockhash cache does not know
+UNKNOWN_BLOCKHASH_CHECK = 5
+
+
+def has_compute_budget(instructions: list, tag: int) -> bool:
+    for ix in instructions:
+        if getattr(ix, "program_id", None) == COMPUTE_BUDGET and bytes(ix.data)[:1] == bytes([tag]):
+            return True
+    return False
+
+
+def writable_accounts(instructions: list) -> list[Pubkey]:
+    accounts = []
+    for ix in instructions:
+        for meta in getattr(ix, "accounts", []):
+            if meta.is_writable and meta.pubkey not in accounts:
+                accounts.append(meta.pubkey)
+    return accounts
+
+
+def shared_writable_accounts(instructions: list, payer: Pubkey) -> list[Pubkey]:
+    """
+    Writable accounts that other wallets write to as well, like pools and program state. The payer, other signers
+    and the payer's token accounts of the mints in the instructions are left out, so the fee samples of one
+    pool are shared by the whole fleet.
+    """
+    metas = [meta for ix in instructions for meta in getattr(ix, "accounts", [])]
+    signers = {meta.pubkey for meta in metas if meta.is_signer}
+    # mints are read-only, the candidates skip the ATA cache so they do not evict the ATAs that are really used
+    mints = {meta.pubkey for meta in metas if not meta.is_writable and not meta.is_signer}
+    own_token_accounts = {
+        derive_program_address((bytes(payer), bytes(program), bytes(mint)), ASSOCIATED_TOKEN_PROGRAM_ID)[0]
+        for mint in mints
+        for program in (TOKEN_PROGRAM_ID, TOKEN_2022_PROGRAM_ID)
+    }
+    return [account for account in writable_accounts(instructions) if account != payer and account not in signers | own_token_accounts]
 
 
 class Transactions:
@@ -33,10 +79,7 @@ class Transactions:
         return (limit_units * cu_price_micro + (MICRO - 1)) // MICRO
 
     async def get_ata(self, token: RawContract) -> Pubkey | None:
-        if token.title == "SOL":
-            ata = get_associated_token_address(self.client.account.pubkey(), token.mint, token.program)
-        else:
-            ata = get_associated_token_address(self.client.account.pubkey(), token.mint, token.program)
+        ata = get_associated_token_address(self.client.account.pubkey(), token.mint, token.program)
 
         resp = await self.client.rpc.get_account_info(ata)
 
@@ -46,7 +89,14 @@ class Transactions:
             return None
         return ata
 
-    async def prepare_tx(self, instructions: list | None, units: int = None, return_ix=False, signers: list = None):
+    async def prepare_tx(
+        self,
+        instructions: list | None,
+        units: int = None,
+        return_ix=False,
+        signers: list = None,
+        fee_percentile: float | None = DEFAULT_PERCENTILE,
+    ):
         if instructions is None:
             instructions = []
 
@@ -68,12 +118,37 @@ class Transactions:
         if return_ix:
             return instructions
 
-        block = await self.client.rpc.get_latest_blockhash()
-        block = block.value.blockhash
+        block = (await get_blockhash_cache(self.client.network).get()).blockhash
 
         message = MessageV0.try_compile(
             instructions=instructions, payer=self.client.account.pubkey(), address_lookup_table_accounts=[], recent_blockhash=block
         )
+
+        budget = []
+        limit = None
+
+        if units is None and not has_compute_budget(instructions, TAG_SET_CU_LIMIT):
+            limit = compute_units.limit_for(compute_units.shape(message))
+            if limit:
+                budget.append(Instructions.set_compute_unit_limit(limit))
+
+        if fee_percentile is not None and not has_compute_budget(instructions, TAG_SET_CU_PRICE):
+            if not limit:
+                limit = min(DEFAULT_UNITS_PER_IX * len(instructions), MAX_COMPUTE_UNITS)
+
+            priority = await self.client.instruct.priority_fee(
+                limit, accounts=shared_writable_accounts(instructions, self.client.account.pubkey()), percentile=fee_percentile
+            )
+            if priority.price:
+                budget.append(Instructions.set_compute_unit_price(priority.price))
+
+        if budget:
+            message = MessageV0.try_compile(
+                instructions=budget + instructions,
+                payer=self.client.account.pubkey(),
+                address_lookup_table_accounts=[],
+                recent_blockhash=block,
+            )
         # if units is None:
         #     if not signers:
         #             signers = [self.client.account]
@@ -89,44 +164,93 @@ class Transactions:
         return message
 
     async def wait_tx_confirmation_lite(self, sig: str, timeout: int = 60):
-        started = time()
+        return await get_confirmation_engine(self.client.network).wait(sig=sig, timeout=timeout)
+
+    async def rebroadcast(self, tx: VersionedTransaction, sig: Signature, interval: float = REBROADCAST_INTERVAL) -> None:
+        """
+        Resends the same signed transaction until its blockhash expires, the signature stays the same so it can land only once.
+
+        Expiry of blockhashes from the blockhash cache is checked against its shared block height. Prebuilt transactions
+        carry a blockhash the cache never saw, it is checked with isBlockhashValid on the first round and every
+        UNKNOWN_BLOCKHASH_CHECK rounds after that. Returns when the transaction is seen on chain after expiry,
+        otherwise raises BlockhashExpired.
+        """
+        blockhashes = get_blockhash_cache(self.client.network)
+        blockhash = tx.message.recent_blockhash
+        last_valid_block_height = blockhashes.last_valid_block_height(blockhash)
+        raw = bytes(tx)
+        rounds = 0
 
         while True:
-            resp = await self.client.rpc.get_signature_statuses([sig], search_transaction_history=True)
-            status = resp.value[0]
+            await asyncio.sleep(interval)
+            rounds += 1
+
+            try:
+                if last_valid_block_height is not None:
+                    expired = await blockhashes.block_height() > last_valid_block_height
+                elif rounds % UNKNOWN_BLOCKHASH_CHECK == 1:
+                    expired = not await blockhashes.is_valid(blockhash)
+                else:
+                    expired = False
 
-            if status is not None:
-                if status.err is None:
-                    if status.confirmation_status == TransactionConfirmationStatus.Confirmed:
-                        return status.confirmation_status
+                if not expired:
+                    await self.client.rpc.send_raw_transaction(raw, opts=TxOpts(skip_preflight=True, max_retries=0))
+                    continue
 
-                else:
-                    raise Exception(status.err)
+                landed = (await self.client.rpc.get_signature_statuses([sig], search_transaction_history=True)).value[0] is not None
 
-            if time() - started > timeout:
-                raise Exception(f"[TX {sig}] timeout after {timeout} sec")
+            except Exception as e:
+                logger.debug(f"[TX {sig}] rebroadcast failed: {e}")
+                continue
 
-            await asyncio.sleep(1)
+            if landed:
+                return
+            raise BlockhashExpired(f"[TX {sig}] blockhash {blockhash} expired")
 
     async def send_tx(self, message, signers=None, skip_simultaion=False):
         if not signers:
             signers = [self.client.account]
 
         tx = VersionedTransaction(message=message, keypairs=signers)
-
-        if isinstance(message, MessageV0):
-            if not skip_simultaion:
-                await self.client.rpc.simulate_transaction(
+        shape = compute_units.shape(message) if isinstance(message, MessageV0) else None
+
+        try:
+            return await self._send_and_confirm(tx, shape, skip_simultaion)
+        except Exception:
+            if shape is not None:
+                # the cached limit may be what made it fail, like "exceeded CUs meter", the next send simulates again
+                compute_units.forget(shape)
+            raise
+
+    async def _send_and_confirm(self, tx: VersionedTransaction, shape: tuple | None, skip_simultaion: bool):
+        if shape is not None:
+            if not skip_simultaion and compute_units.get(shape) is None:
+                sim = await self.client.rpc.simulate_transaction(
                     txn=tx,
                     sig_verify=True,
                 )
 
+                if sim.value is not None and sim.value.err is None:
+                    compute_units.record(shape, sim.value.units_consumed)
+
             sig = await self.client.rpc.send_transaction(txn=tx)
 
         else:
             sig = await self.client.rpc.send_transaction(txn=tx, opts=TxOpts(skip_preflight=True))
 
-        wait_for_send = await self.wait_tx_confirmation_lite(sig=sig.value)
+        confirmation = asyncio.create_task(self.wait_tx_confirmation_lite(sig=sig.value))
+        rebroadcast = asyncio.create_task(self.rebroadcast(tx, sig.value))
+
+        try:
+            await asyncio.wait({confirmation, rebroadcast}, return_when=asyncio.FIRST_COMPLETED)
+            if not confirmation.done():
+                # raises BlockhashExpired, or the transaction landed right at expiry and only the confirmation is left
+                rebroadcast.result()
+            wait_for_send = await confirmation
+
+        finally:
+            confirmation.cancel()
+            rebroadcast.cancel()
 
         if wait_for_send == TransactionConfirmationStatus.Confirmed:
             return sig.value
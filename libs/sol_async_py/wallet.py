@@ -1,18 +1,16 @@
 from __future__ import annotations
 
 import json
-import random
 from typing import TYPE_CHECKING
 
-from solders.instruction import Instruction
 from solders.pubkey import Pubkey
 from solders.rpc.errors import InvalidParamsMessage
 from solders.system_program import TransferParams, transfer
-from solders.token.associated import get_associated_token_address
 from solders.transaction import VersionedTransaction
 from spl.token.instructions import TransferCheckedParams, transfer_checked
 
 from .data.models import RawContract, TokenAmount
+from .pda import get_associated_token_address
 
 if TYPE_CHECKING:
     from .client import Client
@@ -69,6 +67,38 @@ class Wallet:
 
         return TokenAmount(amount=int(balance.value.amount), decimals=balance.value.decimals, wei=True)
 
+    @staticmethod
+    def decode_token_amount(data: bytes) -> int:
+        """SPL token account layout: mint (32) | owner (32) | amount (u64 LE) | ..."""
+        if len(data) < 72:
+            return 0
+        return int.from_bytes(data[64:72], "little")
+
+    async def balances(self, tokens: list[RawContract | None]) -> list[TokenAmount]:
+        """
+        Fetches several balances with one getMultipleAccounts round-trip.
+        None stands for native SOL, every other token is read from its associated token account.
+        """
+        owner = self.client.account.pubkey()
+        keys = [
+            owner
+            if token is None
+            else get_associated_token_address(wallet_address=owner, token_mint_address=token.mint, token_program_id=token.program)
+            for token in tokens
+        ]
+
+        resp = await self.client.rpc.get_multiple_accounts(keys)
+
+        balances = []
+        for token, account in zip(tokens, resp.value):
+            if token is None:
+                balances.append(TokenAmount(amount=account.lamports if account else 0, decimals=9, wei=True))
+            else:
+                amount = self.decode_token_amount(bytes(account.data)) if account else 0
+                balances.append(TokenAmount(amount=amount, decimals=token.decimals, wei=True))
+
+        return balances
+
     async def transfer_native(self, to_address: str | Pubkey, amount: int | TokenAmount, return_ix: bool = False):
         if isinstance(to_address, str):
             to_address = Pubkey.from_string(to_address)
@@ -119,22 +149,7 @@ class Wallet:
         )
         # print(sender_ata, recipient_ata)
 
-        data = random.randint(190000, 200000)
-        Instruction(
-            program_id=Pubkey.from_string("ComputeBudget111111111111111111111111111111"),
-            accounts=[],
-            data=bytes([2]) + (data).to_bytes(4, "little"),
-        )
-
-        # 2. Установка цены за вычислительную единицу
-        # data = random.randint(4900, 5100)
-        data = random.randint(3700, 10000)
-        Instruction(
-            program_id=Pubkey.from_string("ComputeBudget111111111111111111111111111111"),
-            accounts=[],
-            data=bytes([3]) + (data).to_bytes(8, "little"),
-        )
-
+        # ComputeBudget limit and price are added by prepare_tx from the compute unit cache and the fee oracle
         ixs = []
 
         # --- инструкция перевода ---
@@ -1,28 +1,16 @@
+import argparse
 import asyncio
+import os
 import platform
+import sys
 
 # must be called before any other imports
 from utils.pyarmor_bootstrap import ensure_pyarmor_runtime_on_path
 
 ensure_pyarmor_runtime_on_path()
 
-import inquirer
-from colorama import Fore
-from inquirer import themes
-from rich.console import Console
-
-from check_python import check_python_version
+from data.config import PASSWORD_ENV, PASSWORD_FILE_ENV
 from data.constants import PROJECT_NAME
-from functions.activity import activity
-from utils.create_files import create_files, reset_folder
-from utils.db_api.models import Wallet
-from utils.db_api.wallet_api import db
-from utils.db_import_export_sync import Export, Import, Sync
-from utils.git_version import check_for_updates
-from utils.output import show_channel_info
-
-console = Console()
-
 
 PROJECT_ACTIONS = [
     "1. Start SPOT Activity (swaps)",
@@ -35,97 +23,242 @@ PROJECT_ACTIONS = [
 
 UTILS_ACTIONS = ["1. Reset files Folder", "Back"]
 
+# names of the PROJECT_ACTIONS for `main.py run --action`
+CLI_ACTIONS = {
+    "swaps": 1,
+    "withdraw": 2,
+    "to-stables": 3,
+    "stats": 4,
+    "deposit": 5,
+}
+
+EXIT_OK = 0
+EXIT_SOME_FAILED = 1
+EXIT_USAGE = 2
+EXIT_ALL_FAILED = 3
+EXIT_WRONG_PASSWORD = 4
+
+
+async def choose_action(update_check=None):
+    import inquirer
+    from colorama import Fore
+    from inquirer import themes
+    from rich.console import Console
+
+    from data.settings import settings_watcher
 
-async def choose_action():
-    cat_question = [
-        inquirer.List(
-            "category",
-            message=Fore.LIGHTBLACK_EX + "Choose action",
-            choices=["DB Actions", PROJECT_NAME, "Utils", "Exit"],
-        )
-    ]
-
-    answers = inquirer.prompt(cat_question, theme=themes.Default())
-    category = answers.get("category")
-
-    if category == "Exit":
-        console.print(f"[bold red]Exiting {PROJECT_NAME}...[/bold red]")
-        raise SystemExit(0)
-
-    if category == "DB Actions":
-        actions = [
-            "Import wallets to Database",
-            "Sync wallets with tokens and proxies",
-            "Export wallets to TXT",
-            "Back",
+    console = Console()
+
+    while True:
+        if update_check is not None:
+            update_check.offer()
+        settings_watcher.check()
+
+        cat_question = [
+            inquirer.List(
+                "category",
+                message=Fore.LIGHTBLACK_EX + "Choose action",
+                choices=["DB Actions", PROJECT_NAME, "Utils", "Exit"],
+            )
         ]
 
-    if category == PROJECT_NAME:
-        actions = PROJECT_ACTIONS
+        answers = inquirer.prompt(cat_question, theme=themes.Default())
+        category = answers.get("category")
+
+        if category == "Exit":
+            console.print(f"[bold red]Exiting {PROJECT_NAME}...[/bold red]")
+            raise SystemExit(0)
 
-    if category == "Utils":
-        actions = UTILS_ACTIONS
+        if category == "DB Actions":
+            actions = [
+                "Import wallets to Database",
+                "Sync wallets with tokens and proxies",
+                "Export wallets to TXT",
+                "Back",
+            ]
 
-    act_question = [
-        inquirer.List(
-            "action",
-            message=Fore.LIGHTBLACK_EX + f"Choose action in '{category}'",
-            choices=actions,
-        )
-    ]
+        if category == PROJECT_NAME:
+            actions = PROJECT_ACTIONS
 
-    act_answer = inquirer.prompt(act_question, theme=themes.Default())
-    action = act_answer["action"]
+        if category == "Utils":
+            actions = UTILS_ACTIONS
 
-    if action == "Import wallets to Database":
-        console.print(f"[bold blue]Starting Import Wallets to DB[/bold blue]")
-        await Import.wallets()
-    elif action == "Sync wallets with tokens and proxies":
-        console.print(f"[bold blue]Starting sync data in DB[/bold blue]")
-        await Sync.sync_wallets_with_tokens_and_proxies()
-    elif action == "Export wallets to TXT":
-        console.print(f"[bold blue]Starting Import Wallets to DB[/bold blue]")
-        await Export.wallets_to_txt()
+        act_question = [
+            inquirer.List(
+                "action",
+                message=Fore.LIGHTBLACK_EX + f"Choose action in '{category}'",
+                choices=actions,
+            )
+        ]
 
-    elif "1." in action:
-        await activity(action=1)
+        act_answer = inquirer.prompt(act_question, theme=themes.Default())
+        action = act_answer["action"]
 
-    elif "2." in action:
-        await activity(action=2)
+        if action == "Import wallets to Database":
+            from utils.db_import_export_sync import Import
 
-    elif "3." in action:
-        await activity(action=3)
-    elif "4." in action:
-        await activity(action=4)
-    elif "5." in action:
-        await activity(action=5)
+            console.print(f"[bold blue]Starting Import Wallets to DB[/bold blue]")
+            await Import.wallets()
+        elif action == "Sync wallets with tokens and proxies":
+            from utils.db_import_export_sync import Sync
 
-    elif action == "1. Reset files Folder":
-        console.print("This action will delete the files folder and reset it.")
-        answer = input("Are you sure you want to perform this action? y/N ")
-        if answer.lower() == "y":
-            reset_folder()
-            console.print("Files folder success reset")
+            console.print(f"[bold blue]Starting sync data in DB[/bold blue]")
+            await Sync.sync_wallets_with_tokens_and_proxies()
+        elif action == "Export wallets to TXT":
+            from utils.db_import_export_sync import Export
 
-    elif action == "Exit":
-        console.print(f"[bold red]Exiting {PROJECT_NAME}...[/bold red]")
-        raise SystemExit(0)
+            console.print(f"[bold blue]Starting Import Wallets to DB[/bold blue]")
+            await Export.wallets_to_txt()
 
-    await choose_action()
+        elif action == "1. Reset files Folder":
+            from utils.create_files import reset_folder
 
+            console.print("This action will delete the files folder and reset it.")
+            answer = input("Are you sure you want to perform this action? y/N ")
+            if answer.lower() == "y":
+                reset_folder()
+                console.print("Files folder success reset")
+
+        elif action in PROJECT_ACTIONS[:-1]:
+            # solana, the obfuscated titan module and the HTTP clients are only loaded once an action needs them
+            from functions.activity import activity
+
+            await activity(action=PROJECT_ACTIONS.index(action) + 1)
+
+        elif action == "Exit":
+            console.print(f"[bold red]Exiting {PROJECT_NAME}...[/bold red]")
+            raise SystemExit(0)
+
+
+def prepare():
+    from check_python import check_python_version
+    from utils.create_files import create_files
 
-async def main():
     check_python_version()
+    # data.settings reads files/settings.yaml on import, so the files must exist before the database modules are loaded
     create_files()
+
+    from utils.db_api.models import Job, Wallet
+    from utils.db_api.wallet_api import db
+
     db.ensure_model_columns(Wallet)
-    await check_for_updates(repo_name=PROJECT_NAME)
-    await choose_action()
+    db.ensure_model_columns(Job)
+
+
+async def main():
+    from utils.git_version import BackgroundUpdateCheck
+
+    prepare()
+    await choose_action(update_check=BackgroundUpdateCheck(repo_name=PROJECT_NAME).start())
+
+
+def action_number(value: str) -> int:
+    if value.isdigit() and int(value) in CLI_ACTIONS.values():
+        return int(value)
+    if value in CLI_ACTIONS:
+        return CLI_ACTIONS[value]
+    raise argparse.ArgumentTypeError(f"unknown action '{value}', expected one of: {', '.join(CLI_ACTIONS)} or 1-{len(CLI_ACTIONS)}")
+
+
+def wallet_numbers(value: str) -> set[int]:
+    """Parses 1-based wallet numbers like '1-500' or '1,3,8-10'."""
+    numbers = set()
+    try:
+        for part in value.split(","):
+            start, _, end = part.strip().partition("-")
+            start, end = int(start), int(end or start)
+            if start < 1 or end < start:
+                raise ValueError
+            numbers.update(range(start, end + 1))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid wallets '{value}', expected numbers and ranges like 1-500 or 1,3,8-10")
+    return numbers
+
+
+def positive_int(value: str) -> int:
+    if not value.isdigit() or int(value) < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive number, got '{value}'")
+    return int(value)
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=f"{PROJECT_NAME}. Without a command the interactive menu is started.",
+        epilog=(
+            f"exit codes: {EXIT_OK} all wallets succeeded, {EXIT_SOME_FAILED} some wallets failed, {EXIT_USAGE} invalid arguments, "
+            f"{EXIT_ALL_FAILED} all wallets failed, {EXIT_WRONG_PASSWORD} wrong password. "
+            f"With private key encryption on, a run without a terminal reads the password from {PASSWORD_ENV} "
+            f"or the file named in {PASSWORD_FILE_ENV}"
+        ),
+    )
+    commands = parser.add_subparsers(dest="command")
+
+    run = commands.add_parser("run", help="run an action without the interactive menu")
+    run.add_argument("--action", type=action_number, required=True, help=f"{', '.join(CLI_ACTIONS)} or its menu number")
+    run.add_argument("--wallets", type=wallet_numbers, help="wallet numbers like 1-500 or 1,3,8-10, overrides the wallets from settings")
+    run.add_argument("--threads", type=positive_int, help="concurrent wallets per process, overrides threads from settings")
+    run.add_argument("--processes", type=positive_int, help="spread the wallets over this many worker processes")
+    run.add_argument("--once", action="store_true", help="run repeating actions like swaps a single cycle and exit")
+    run.add_argument("--check-updates", action="store_true", help="look for a newer version on GitHub and log it, off for scripted runs")
+    run.add_argument("--password-file", help=f"file with the encryption password on its first line, same as {PASSWORD_FILE_ENV}")
+
+    return parser.parse_args(argv)
+
+
+def exit_code(processed) -> int:
+    from utils.db_api.job_queue import DONE, FAILED
+
+    if processed is None:
+        return EXIT_WRONG_PASSWORD
+    if not processed[FAILED]:
+        return EXIT_OK
+    if not processed[DONE]:
+        return EXIT_ALL_FAILED
+    return EXIT_SOME_FAILED
+
+
+async def run(args: argparse.Namespace) -> int:
+    from loguru import logger
+
+    prepare()
+    if args.check_updates:
+        from utils.git_version import BackgroundUpdateCheck
+
+        # only logs a found update, a headless run never prompts
+        BackgroundUpdateCheck(repo_name=PROJECT_NAME).start()
+
+    if args.password_file:
+        # worker processes of run_sharded inherit it with the environment
+        os.environ[PASSWORD_FILE_ENV] = args.password_file
+
+    from functions.activity import select_wallets
+
+    if not select_wallets(args.wallets):
+        logger.error("No wallets selected, check --wallets or the wallets to run in settings")
+        return EXIT_USAGE
+
+    if args.processes and args.processes > 1:
+        from functions.runner import run_sharded
+
+        processed = await run_sharded(args.action, args.processes, wallet_numbers=args.wallets, threads=args.threads, once=args.once)
+    else:
+        from functions.activity import activity
+
+        processed = await activity(args.action, wallet_numbers=args.wallets, threads=args.threads, once=args.once)
+
+    return exit_code(processed)
 
 
 if __name__ == "__main__":
-    show_channel_info(PROJECT_NAME)
+    args = parse_args(sys.argv[1:])
 
     if platform.system() == "Windows":
         asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
 
+    if args.command == "run":
+        sys.exit(asyncio.run(run(args)))
+
+    from utils.output import show_channel_info
+
+    show_channel_info(PROJECT_NAME)
     asyncio.run(main())
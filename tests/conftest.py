@@ -0,0 +1,8 @@
+from utils.pyarmor_bootstrap import ensure_pyarmor_runtime_on_path
+
+ensure_pyarmor_runtime_on_path()
+
+from utils.create_files import create_files  # noqa: E402
+
+# data.settings reads files/settings.yaml on import, like main.py the files are created first
+create_files()
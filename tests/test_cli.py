@@ -0,0 +1,74 @@
+import argparse
+import asyncio
+
+import pytest
+
+import main
+from utils import encryption
+
+
+@pytest.mark.parametrize("value", ["5-1", "0-3", "1,x", ""])
+def test_invalid_wallet_numbers_are_rejected(value: str):
+    with pytest.raises(argparse.ArgumentTypeError):
+        main.wallet_numbers(value)
+
+
+def test_wallet_numbers():
+    assert main.wallet_numbers("1,3,8-10") == {1, 3, 8, 9, 10}
+
+
+def test_password_is_read_from_env_or_file(tmp_path, monkeypatch):
+    monkeypatch.delenv(encryption.PASSWORD_ENV, raising=False)
+    monkeypatch.delenv(encryption.PASSWORD_FILE_ENV, raising=False)
+    assert encryption.password_from_env() is None
+
+    password_file = tmp_path / "password"
+    password_file.write_text("from file\nignored\n")
+    monkeypatch.setenv(encryption.PASSWORD_FILE_ENV, str(password_file))
+    assert encryption.password_from_env() == b"from file"
+
+    monkeypatch.setenv(encryption.PASSWORD_ENV, " from env ")
+    assert encryption.password_from_env() == b"from env"
+
+
+@pytest.fixture
+def update_checks(monkeypatch) -> list:
+    """Update checks started by `main.py run`, none of them reaches GitHub."""
+    from utils import git_version
+
+    started = []
+    monkeypatch.setattr(git_version.BackgroundUpdateCheck, "start", lambda self: started.append(self) or self)
+    return started
+
+
+@pytest.fixture
+def headless_run(update_checks, monkeypatch):
+    """functions.activity with the menu setup of `main.py run` skipped."""
+    activity = pytest.importorskip("functions.activity")
+    monkeypatch.setattr(main, "prepare", lambda: None)
+    return activity
+
+
+def test_no_selected_wallets_is_a_usage_error(headless_run, monkeypatch):
+    monkeypatch.setattr(headless_run, "select_wallets", lambda numbers: [])
+
+    assert asyncio.run(main.run(main.parse_args(["run", "--action", "swaps", "--wallets", "1"]))) == main.EXIT_USAGE
+
+
+def test_out_of_password_attempts_exits_as_wrong_password(headless_run, monkeypatch):
+    def check_encrypt_param():
+        raise RuntimeError("Password confirmation failed – too many attempts.")
+
+    monkeypatch.setattr(headless_run, "check_encrypt_param", check_encrypt_param)
+    monkeypatch.setattr(headless_run, "select_wallets", lambda numbers: [object()])
+
+    assert asyncio.run(main.run(main.parse_args(["run", "--action", "swaps", "--wallets", "1"]))) == main.EXIT_WRONG_PASSWORD
+
+
+@pytest.mark.parametrize("flags, checks", [([], 0), (["--check-updates"], 1)])
+def test_update_check_is_opt_in(headless_run, update_checks, monkeypatch, flags: list[str], checks: int):
+    monkeypatch.setattr(headless_run, "select_wallets", lambda numbers: [])
+
+    asyncio.run(main.run(main.parse_args(["run", "--action", "swaps", *flags])))
+
+    assert len(update_checks) == checks
@@ -0,0 +1,70 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from solders.hash import Hash
+from solders.keypair import Keypair
+from solders.message import MessageV0
+from solders.system_program import TransferParams, transfer
+
+from libs.sol_async_py import instructions, transactions
+from libs.sol_async_py.compute_units import BUDGET_INSTRUCTIONS, BUDGET_IX_UNITS, ComputeUnitEstimator
+from libs.sol_async_py.instructions import LAMPORTS_PER_SOL, MAX_PRIORITY_FEE_SOL, MICRO, Instructions
+from libs.sol_async_py.transactions import Transactions
+
+# units_consumed of a simulated SOL transfer without compute budget instructions
+TRANSFER_UNITS = 300
+RECIPIENT = Keypair().pubkey()
+
+
+def transfer_message(payer: Keypair, budget: list | None = None) -> MessageV0:
+    ix = transfer(TransferParams(from_pubkey=payer.pubkey(), to_pubkey=RECIPIENT, lamports=1))
+    return MessageV0.try_compile(payer.pubkey(), (budget or []) + [ix], [], Hash.default())
+
+
+def test_limit_of_a_tiny_shape_covers_the_budget_instructions():
+    estimator = ComputeUnitEstimator()
+    shape = estimator.shape(transfer_message(Keypair()))
+    estimator.record(shape, TRANSFER_UNITS)
+
+    assert estimator.limit_for(shape) >= TRANSFER_UNITS + BUDGET_IX_UNITS * BUDGET_INSTRUCTIONS
+
+
+def test_budget_instructions_do_not_change_the_shape():
+    payer = Keypair()
+    budget = [Instructions.set_compute_unit_limit(1_000), Instructions.set_compute_unit_price(1)]
+
+    assert ComputeUnitEstimator.shape(transfer_message(payer)) == ComputeUnitEstimator.shape(transfer_message(payer, budget))
+
+
+def test_failed_send_forgets_the_cached_units(monkeypatch):
+    estimator = ComputeUnitEstimator()
+    monkeypatch.setattr(transactions, "compute_units", estimator)
+
+    payer = Keypair()
+    message = transfer_message(payer)
+    shape = estimator.shape(message)
+    estimator.record(shape, TRANSFER_UNITS)
+
+    async def send_transaction(txn, **kwargs):
+        raise Exception("Program failed to complete: exceeded CUs meter at BPF instruction")
+
+    client = SimpleNamespace(account=payer, rpc=SimpleNamespace(send_transaction=send_transaction))
+
+    with pytest.raises(Exception, match="exceeded CUs meter"):
+        asyncio.run(Transactions(client).send_tx(message))
+    assert estimator.limit_for(shape) is None
+
+
+def test_compiled_price_comes_from_the_fee_oracle_within_the_cap(monkeypatch):
+    class Oracle:
+        async def fee_for(self, percentile, accounts=None):
+            return 10**12
+
+    monkeypatch.setattr(instructions, "get_fee_oracle", lambda network: Oracle())
+    limit = 200_000
+
+    ix = asyncio.run(Instructions(SimpleNamespace(network=None)).compile_priced_compute_unit_price(limit))
+    price = int.from_bytes(bytes(ix.data)[1:9], "little")
+
+    assert price == int(MAX_PRIORITY_FEE_SOL * LAMPORTS_PER_SOL) * MICRO // limit
@@ -0,0 +1,75 @@
+import asyncio
+import json
+
+import pytest
+import websockets
+from solders.signature import Signature
+from solders.transaction_status import TransactionConfirmationStatus
+
+from libs.sol_async_py.confirmation import ConfirmationEngine
+from libs.sol_async_py.data.models import Network
+
+
+class StandInWebsocket:
+    """Local websocket that acknowledges signatureSubscribe after `ack_delay` seconds and never notifies."""
+
+    def __init__(self, ack_delay: float = 0.0):
+        self.ack_delay = ack_delay
+        self.subscribed: list[int] = []
+        self.unsubscribed: list[int] = []
+
+    async def handler(self, ws):
+        async for raw in ws:
+            request = json.loads(raw)
+            if request["method"] == "signatureSubscribe":
+                await asyncio.sleep(self.ack_delay)
+                subscription = len(self.subscribed) + 100
+                self.subscribed.append(subscription)
+                await ws.send(json.dumps({"jsonrpc": "2.0", "result": subscription, "id": request["id"]}))
+            elif request["method"] == "signatureUnsubscribe":
+                self.unsubscribed.append(request["params"][0])
+                await ws.send(json.dumps({"jsonrpc": "2.0", "result": True, "id": request["id"]}))
+
+
+async def run_wait(stand_in: StandInWebsocket, timeout: float, resolve_after: float | None):
+    async with websockets.serve(stand_in.handler, "127.0.0.1", 0) as server:
+        port = server.sockets[0].getsockname()[1]
+        # the http endpoint is only used by the poller, its failed polls are retried with backoff
+        network = Network(name="stand-in", endpoint="http://127.0.0.1:9", ws_endpoint=f"ws://127.0.0.1:{port}", decimals=9)
+        engine = ConfirmationEngine(network)
+        sig = Signature.new_unique()
+
+        async def resolve():
+            await asyncio.sleep(resolve_after)
+            engine.poller.resolve(sig, None)
+
+        if resolve_after is not None:
+            asyncio.create_task(resolve())
+
+        try:
+            try:
+                return await engine.wait(sig, timeout=timeout)
+            finally:
+                # the unsubscribe and its answer travel over the websocket
+                await asyncio.sleep(max(stand_in.ack_delay, 0.1) + 0.2)
+                assert engine._subscriptions == {}
+                assert engine._ws.subscriptions == {}
+                assert engine._ws.sent_subscriptions == {}
+        finally:
+            await engine.close()
+
+
+@pytest.mark.parametrize("ack_delay", [0.0, 0.3])
+def test_subscription_of_a_polled_confirmation_is_unsubscribed(ack_delay: float):
+    stand_in = StandInWebsocket(ack_delay=ack_delay)
+
+    assert asyncio.run(run_wait(stand_in, timeout=5, resolve_after=0.1)) == TransactionConfirmationStatus.Confirmed
+    assert stand_in.unsubscribed == stand_in.subscribed == [100]
+
+
+def test_subscription_of_a_timed_out_wait_is_unsubscribed():
+    stand_in = StandInWebsocket()
+
+    with pytest.raises(Exception, match="timeout"):
+        asyncio.run(run_wait(stand_in, timeout=0.3, resolve_after=None))
+    assert stand_in.unsubscribed == stand_in.subscribed == [100]
@@ -0,0 +1,21 @@
+from cryptography.fernet import Fernet
+from solders.keypair import Keypair
+
+from libs.sol_async_py.keypairs import keypair_cache
+from utils.encryption import set_cipher_key
+from utils.key_vault import key_vault
+
+
+def test_new_cipher_key_forgets_decrypted_keys_and_keypairs():
+    key = Fernet.generate_key()
+    token = Fernet(key).encrypt(str(Keypair()).encode()).decode()
+    set_cipher_key(key)
+
+    keypair_cache.get(1, key_vault.decrypt(token))
+    assert key_vault.stats()["keys"] == 1
+    assert keypair_cache.stats()["keypairs"] == 1
+
+    set_cipher_key(Fernet.generate_key())
+
+    assert key_vault.stats()["keys"] == 0
+    assert keypair_cache.stats()["keypairs"] == 0
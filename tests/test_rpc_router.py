@@ -0,0 +1,216 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from solders.rpc.requests import GetBlockHeight, SendRawTransaction
+
+from libs.sol_async_py import rpc_router as rpc_router_module
+from libs.sol_async_py.rpc_pool import RpcClientPool
+from libs.sol_async_py.rpc_router import RateLimitedProvider, RoutedProvider, RpcRouter
+from utils.rate_limiter import rate_limiter
+
+
+class StandIn:
+    """Local JSON-RPC endpoint that answers every request with `status` and `result` after `delay` seconds."""
+
+    def __init__(self, result=250_000_000, status: int = 200, delay: float = 0.0, error: dict | None = None):
+        self.result = result
+        self.status = status
+        self.delay = delay
+        self.error = error
+        self.requests: list[str] = []
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self.handler())
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.endpoint = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def handler(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                stand_in.requests.append(request["method"])
+                time.sleep(stand_in.delay)
+
+                answer = {"jsonrpc": "2.0", "id": request["id"]}
+                if stand_in.error is not None:
+                    answer["error"] = stand_in.error
+                else:
+                    answer["result"] = stand_in.result
+                body = json.dumps(answer).encode()
+
+                try:
+                    self.send_response(stand_in.status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # the client cancelled the losing request of a hedged pair
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+@pytest.fixture
+def stand_ins(monkeypatch):
+    # no rate limit on the local endpoints and buckets of other tests stay untouched
+    monkeypatch.setattr(rate_limiter, "_overrides", {"rpc": 0})
+    monkeypatch.setattr(rate_limiter, "_buckets", {})
+
+    started: list[StandIn] = []
+
+    def start(**kwargs) -> StandIn:
+        stand_in = StandIn(**kwargs)
+        started.append(stand_in)
+        return stand_in
+
+    yield start
+
+    for stand_in in started:
+        stand_in.server.shutdown()
+        stand_in.server.server_close()
+
+
+def routed(*stand_ins: StandIn) -> RoutedProvider:
+    return RoutedProvider([stand_in.endpoint for stand_in in stand_ins], router=RpcRouter())
+
+
+async def read(provider: RoutedProvider) -> int:
+    return json.loads(await provider.make_request_unparsed(GetBlockHeight()))["result"]
+
+
+def test_failed_read_fails_over_to_the_next_endpoint(stand_ins):
+    failing, healthy = stand_ins(status=500), stand_ins(result=42)
+
+    async def run():
+        provider = routed(failing, healthy)
+        try:
+            return await read(provider), provider.router.stats()
+        finally:
+            await provider.close()
+
+    result, stats = asyncio.run(run())
+
+    assert result == 42
+    assert failing.requests == ["getBlockHeight"]
+    assert stats[failing.endpoint]["errors"] == 1
+    assert stats[healthy.endpoint]["errors"] == 0
+
+
+def test_read_fails_when_every_endpoint_fails(stand_ins):
+    endpoints = stand_ins(status=500), stand_ins(status=503)
+
+    async def run():
+        provider = routed(*endpoints)
+        try:
+            await read(provider)
+        finally:
+            await provider.close()
+
+    with pytest.raises(Exception):
+        asyncio.run(run())
+    assert all(stand_in.requests == ["getBlockHeight"] for stand_in in endpoints)
+
+
+def test_slow_read_is_hedged_with_the_next_endpoint(stand_ins, monkeypatch):
+    monkeypatch.setattr(rpc_router_module, "DEFAULT_HEDGE_DELAY", 0.05)
+    stalled, fast = stand_ins(result=1, delay=1.0), stand_ins(result=2)
+
+    async def run():
+        provider = routed(stalled, fast)
+        try:
+            started = time.perf_counter()
+            return await read(provider), time.perf_counter() - started
+        finally:
+            await provider.close()
+
+    result, elapsed = asyncio.run(run())
+
+    assert result == 2
+    assert elapsed < 0.5
+    assert stalled.requests == fast.requests == ["getBlockHeight"]
+
+
+def test_broadcast_returns_the_first_accepted_signature(stand_ins):
+    signature = "5" * 88
+    rejecting = stand_ins(error={"code": -32002, "message": "Transaction simulation failed"})
+    accepting = stand_ins(result=signature, delay=0.05)
+
+    async def run():
+        provider = routed(rejecting, accepting)
+        try:
+            return json.loads(await provider.make_request_unparsed(SendRawTransaction(b"\x00" * 64)))
+        finally:
+            await provider.close()
+
+    answer = asyncio.run(run())
+
+    assert answer["result"] == signature
+    assert rejecting.requests == accepting.requests == ["sendTransaction"]
+
+
+def test_broadcast_returns_the_rejection_when_no_endpoint_accepts(stand_ins):
+    rejecting = (
+        stand_ins(error={"code": -32002, "message": "Blockhash not found"}),
+        stand_ins(error={"code": -32002, "message": "Blockhash not found"}),
+    )
+
+    async def run():
+        provider = routed(*rejecting)
+        try:
+            return json.loads(await provider.make_request_unparsed(SendRawTransaction(b"\x00" * 64)))
+        finally:
+            await provider.close()
+
+    assert asyncio.run(run())["error"]["message"] == "Blockhash not found"
+
+
+def test_pooled_client_uses_the_rate_limited_provider_only(stand_ins):
+    stand_in = stand_ins(result=7)
+    pool = RpcClientPool()
+
+    async def run():
+        rpc = pool.acquire(stand_in.endpoint)
+        provider = rpc._provider
+        height = (await rpc.get_block_height()).value
+        await pool.release(stand_in.endpoint)
+        return provider, height
+
+    provider, height = asyncio.run(run())
+
+    assert height == 7
+    assert type(provider) is RateLimitedProvider
+    assert provider.session.is_closed
+    assert pool.stats()["transports"] == 0
+
+
+def test_background_clients_skip_the_rpc_rate_limit(stand_ins, monkeypatch):
+    stand_in = stand_ins(result=7)
+    monkeypatch.setattr(rate_limiter, "_overrides", {"rpc": 1})
+    pool = RpcClientPool()
+
+    async def run():
+        background = pool.acquire(stand_in.endpoint, background=True)
+        for _ in range(3):
+            await background.get_block_height()
+        await pool.release(stand_in.endpoint, background=True)
+
+        wallet = pool.acquire(stand_in.endpoint)
+        await wallet.get_block_height()
+        await pool.release(stand_in.endpoint)
+
+    asyncio.run(run())
+
+    assert len(stand_in.requests) == 4
+    assert rate_limiter.stats() == {f"rpc:{stand_in.endpoint}": {"acquired": 1, "waited": 0.0}}
@@ -0,0 +1,150 @@
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+
+from utils.db_api import job_queue
+from utils.db_api.db import DB
+from utils.db_api.job_queue import DONE, JobQueue
+from utils.db_api.models import Base, Job, Wallet
+
+# the obfuscated titan module behind functions.activity ships runtimes for the supported platforms only
+activity = pytest.importorskip("functions.activity")
+
+WALLETS = 40
+WORKERS = 4
+
+
+@pytest.fixture
+def wallets_db(tmp_path, monkeypatch) -> DB:
+    # a lock that is never released fails after 2s instead of the default 30s
+    test_db = DB(f"sqlite:///{tmp_path / 'wallets.db'}", pragmas={"busy_timeout": 2000}, connect_args={"check_same_thread": False})
+    test_db.create_tables(Base)
+    test_db.insert([Wallet(private_key=f"key-{number}", address=f"address-{number}") for number in range(1, WALLETS + 1)])
+
+    monkeypatch.setattr(activity, "db", test_db)
+    monkeypatch.setattr(job_queue, "db", test_db)
+    return test_db
+
+
+def test_workers_with_write_behind_do_not_lock_the_db(wallets_db: DB):
+    async def task(wallet: Wallet):
+        # every worker gathers its update into the write-behind flush while the others lease and finish jobs
+        wallets_db.save_later(wallet, total_trades=wallet.total_trades + 1)
+        await asyncio.sleep(0.1)
+
+    async def run() -> dict:
+        wallets = wallets_db.all(Wallet)
+        queue = JobQueue(action=1)
+        queue.sync([wallet.id for wallet in wallets])
+
+        processed = await asyncio.wait_for(
+            activity.run_jobs(queue, {wallet.id: wallet for wallet in wallets}, task, threads=WORKERS), timeout=30
+        )
+        wallets_db.commit_pending()
+        return processed
+
+    processed = asyncio.run(run())
+
+    assert processed == {DONE: WALLETS}
+    with wallets_db.engine.connect() as conn:
+        assert conn.scalar(select(func.sum(Wallet.total_trades))) == WALLETS
+        assert conn.scalar(select(func.count()).where(Job.status == DONE)) == WALLETS
+
+
+def test_jobs_of_missing_wallets_are_dropped(wallets_db: DB):
+    async def task(wallet: Wallet):
+        await asyncio.sleep(0)
+
+    async def run() -> dict:
+        wallets = wallets_db.all(Wallet)
+        queue = JobQueue(action=1)
+        # wallet 0 does not exist, its job must not end a worker with an AttributeError
+        queue.sync([0] + [wallet.id for wallet in wallets])
+        return await asyncio.wait_for(
+            activity.run_jobs(queue, {wallet.id: wallet for wallet in wallets}, task, threads=WORKERS), timeout=30
+        )
+
+    assert asyncio.run(run()) == {DONE: WALLETS}
+    with wallets_db.engine.connect() as conn:
+        assert conn.scalar(select(func.count()).where(Job.wallet_id == 0)) == 0
+
+
+def test_requeue_stale_keeps_live_leases(wallets_db: DB):
+    queue = JobQueue(action=1, owner="worker-a")
+    queue.sync([1, 2])
+    live = queue.lease()
+    expired = JobQueue(action=1, owner="worker-b", lease_ttl=-1).lease()
+
+    assert JobQueue(action=1).requeue_stale() == 1
+    with wallets_db.engine.connect() as conn:
+        statuses = {wallet_id: status for wallet_id, status in conn.execute(select(Job.wallet_id, Job.status))}
+    assert statuses == {live.wallet_id: job_queue.RUNNING, expired.wallet_id: job_queue.PENDING}
+
+
+def test_repeating_action_trims_shared_clients_every_cycle(wallets_db: DB, monkeypatch):
+    cycles = []
+
+    async def trim_shared_clients():
+        cycles.append(True)
+
+    async def task(wallet: Wallet):
+        await asyncio.sleep(0)
+
+    monkeypatch.setattr(activity, "random_pause", lambda pause_min, pause_max: 0)
+    monkeypatch.setattr(activity, "trim_shared_clients", trim_shared_clients)
+
+    async def run():
+        wallets = wallets_db.all(Wallet)
+        queue = JobQueue(action=1)
+        queue.sync([wallet.id for wallet in wallets])
+        await activity.run_jobs(queue, {wallet.id: wallet for wallet in wallets}, task, threads=WORKERS, repeat=True)
+
+    # the workers of a repeating action never return
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(asyncio.wait_for(run(), timeout=3))
+
+    assert len(cycles) >= 2
+
+
+def test_worker_process_does_not_preload_the_fleet(wallets_db: DB, monkeypatch):
+    preloaded = []
+    monkeypatch.setattr(activity, "preload_private_keys", lambda enc_values: preloaded.append(enc_values) or 0)
+
+    async def task(wallet: Wallet):
+        await asyncio.sleep(0)
+
+    wallets = wallets_db.all(Wallet)
+    # the parent process of a sharded run schedules the queue, its workers join it with schedule=False
+    JobQueue(action=1).sync([wallet.id for wallet in wallets])
+
+    processed = asyncio.run(asyncio.wait_for(activity.execute(wallets, task, action=1, schedule=False, threads=WORKERS), timeout=30))
+
+    assert processed == {DONE: WALLETS}
+    assert preloaded == []
+
+
+def test_failed_task_does_not_discard_the_writes_of_others(wallets_db: DB):
+    first, second = wallets_db.all(Wallet)[:2]
+
+    async def saves():
+        wallets_db.save_later(first, total_trades=5)
+        await asyncio.sleep(0.05)
+
+    async def fails():
+        with wallets_db.session():
+            wallets_db.save(second, total_trades=7)
+            raise RuntimeError("task failed")
+
+    async def run():
+        results = await asyncio.gather(saves(), fails(), return_exceptions=True)
+        wallets_db.commit_pending()
+        return results
+
+    assert isinstance(asyncio.run(run())[1], RuntimeError)
+    with wallets_db.engine.connect() as conn:
+        trades = {wallet_id: total for wallet_id, total in conn.execute(select(Wallet.id, Wallet.total_trades))}
+    assert trades[first.id] == 5
+    assert trades[second.id] == 0
+    # the shared session has nothing of the tasks to flush
+    assert not wallets_db.s.dirty
@@ -0,0 +1,54 @@
+import os
+
+import pytest
+import yaml
+
+from data import settings as settings_module
+from data.settings import Settings, SettingsWatcher
+
+
+@pytest.fixture
+def settings_file(tmp_path, monkeypatch):
+    path = tmp_path / "settings.yaml"
+    path.write_text(yaml.safe_dump({"log_level": "INFO", "rate_limits": None}))
+    monkeypatch.setattr(Settings, "_current", Settings.load(str(path)))
+    return path
+
+
+def touch(path, data: dict):
+    path.write_text(yaml.safe_dump(data))
+    # a new mtime even on file systems with coarse timestamps
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_empty_rate_limits_are_a_dict(settings_file):
+    assert Settings().rate_limits == {}
+
+
+def test_missing_file_keeps_the_previous_settings(settings_file):
+    previous = Settings()
+    settings_file.unlink()
+
+    watcher = SettingsWatcher(path=str(settings_file))
+    assert watcher.check() is False
+    assert watcher.check() is False
+    assert Settings() is previous
+
+    touch(settings_file, {"log_level": "INFO", "threads": 7})
+    assert watcher.check() is True
+    assert Settings().threads == 7
+
+
+def test_reload_applies_the_log_level(settings_file, monkeypatch):
+    levels = []
+    monkeypatch.setattr(settings_module, "set_log_level", levels.append)
+    watcher = SettingsWatcher(path=str(settings_file))
+
+    touch(settings_file, {"log_level": "DEBUG"})
+    assert watcher.check() is True
+    assert levels == ["DEBUG"]
+
+    touch(settings_file, {"log_level": "LOUD"})
+    assert watcher.check() is False
+    assert Settings().log_level == "DEBUG"
@@ -1,43 +1,169 @@
-from typing import Optional
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from time import monotonic
+from typing import TYPE_CHECKING, Optional
+
+from loguru import logger
 
 from libs.baseAsyncSession import BaseAsyncSession
-from utils.db_api.models import Wallet
+from utils.rate_limiter import rate_limiter
+
+if TYPE_CHECKING:
+    from utils.db_api.models import Wallet
+
+IDLE_TIMEOUT = 90
+
+# (wallet id, proxy) of a pooled session
+SessionKey = tuple[int | None, str | None]
+
+
+@dataclass
+class PooledSession:
+    session: BaseAsyncSession
+    # Browsers inside `async with` and requests in flight
+    users: int = 0
+    requests: int = 0
+    closing: bool = False
+    last_used: float = field(default_factory=monotonic)
+
+    @property
+    def busy(self) -> bool:
+        return bool(self.users or self.requests)
+
+
+class SessionPool:
+    """
+    Keeps one keep-alive BaseAsyncSession per (wallet id, proxy), so repeated requests of a wallet reuse TLS
+    connections and the impersonation setup instead of building a new session every time.
+
+    Wallets never share a session, their cookie jars and auth state stay separate even without or with the same
+    proxy. Browsers without a wallet share one session per proxy whose cookies are dropped on every checkout.
+    A session is closed only once no Browser holds it and no request is in flight.
+    """
+
+    def __init__(self, idle_timeout: float = IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self._sessions: dict[SessionKey, PooledSession] = {}
+
+    def _get(self, key: SessionKey) -> PooledSession:
+        pooled = self._sessions.get(key)
+        if pooled is None:
+            pooled = PooledSession(session=BaseAsyncSession(proxy=key[1]))
+            self._sessions[key] = pooled
+
+        pooled.closing = False
+        pooled.last_used = monotonic()
+        return pooled
+
+    @asynccontextmanager
+    async def checkout(self, key: SessionKey):
+        """The session of the key for one request, it is not closed while the request is in flight."""
+        await self.evict_idle()
+        pooled = self._get(key)
+        if key[0] is None:
+            pooled.session.cookies.clear()
+
+        pooled.requests += 1
+        try:
+            yield pooled.session
+        finally:
+            pooled.requests -= 1
+            pooled.last_used = monotonic()
+            if pooled.closing and not pooled.busy:
+                await self._close(key)
+
+    async def retain(self, key: SessionKey) -> BaseAsyncSession:
+        pooled = self._get(key)
+        pooled.users += 1
+        return pooled.session
+
+    async def release(self, key: SessionKey) -> None:
+        pooled = self._sessions.get(key)
+        if pooled is None:
+            return
+
+        pooled.users = max(pooled.users - 1, 0)
+        if pooled.users == 0:
+            # requests of Browsers that never retained the session finish before it is closed
+            pooled.closing = True
+            if not pooled.busy:
+                await self._close(key)
+
+        await self.evict_idle()
+
+    async def evict_idle(self) -> None:
+        now = monotonic()
+        expired = [key for key, pooled in self._sessions.items() if not pooled.busy and now - pooled.last_used > self.idle_timeout]
+        for key in expired:
+            await self._close(key)
+
+    async def close_all(self) -> None:
+        for key in list(self._sessions):
+            await self._close(key)
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._sessions),
+            "in_use": sum(1 for pooled in self._sessions.values() if pooled.busy),
+        }
+
+    async def _close(self, key: SessionKey) -> None:
+        pooled = self._sessions.pop(key, None)
+        if pooled is None:
+            return
+
+        try:
+            await pooled.session.close()
+        except Exception as e:
+            logger.debug(f"Browser | failed to close pooled session: {e}")
+
+
+session_pool = SessionPool()
 
 
 class Browser:
     __module__ = "Browser"
 
-    def __init__(self, wallet: Optional[Wallet] = None):
-        self.wallet: Optional[Wallet] = wallet
+    def __init__(self, wallet: Optional["Wallet"] = None, pool: SessionPool | None = None):
+        self.wallet: Optional["Wallet"] = wallet
+        self.pool: SessionPool = pool or session_pool
         self.async_session: Optional[BaseAsyncSession] = None
+        # key the session was retained with, released by close()
+        self._key: SessionKey | None = None
+
+    @property
+    def proxy(self) -> str | None:
+        return self.wallet.proxy if self.wallet else None
 
-    async def _ensure_session(self):
-        if self.async_session is None:
-            proxy = self.wallet.proxy if self.wallet else None
-            self.async_session = BaseAsyncSession(proxy=proxy)
+    @property
+    def key(self) -> SessionKey:
+        return (self.wallet.id if self.wallet else None, self.proxy)
 
-    async def _close_session(self):
-        if self.async_session:
-            await self.async_session.close()
-            self.async_session = None
+    async def __aenter__(self) -> "Browser":
+        self._key = self.key
+        self.async_session = await self.pool.retain(self._key)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        if self._key is not None:
+            key, self._key = self._key, None
+            await self.pool.release(key)
+        self.async_session = None
+
+    async def _request(self, method: str, **kwargs):
+        await rate_limiter.acquire(proxy=self.proxy, url=kwargs.get("url"))
+        async with self.pool.checkout(self._key or self.key) as session:
+            self.async_session = session
+            return await getattr(session, method)(**kwargs)
 
     async def get(self, **kwargs):
-        await self._ensure_session()
-        try:
-            return await self.async_session.get(**kwargs)
-        finally:
-            await self._close_session()
+        return await self._request("get", **kwargs)
 
     async def post(self, **kwargs):
-        await self._ensure_session()
-        try:
-            return await self.async_session.post(**kwargs)
-        finally:
-            await self._close_session()
+        return await self._request("post", **kwargs)
 
     async def put(self, **kwargs):
-        await self._ensure_session()
-        try:
-            return await self.async_session.put(**kwargs)
-        finally:
-            await self._close_session()
+        return await self._request("put", **kwargs)
@@ -1,21 +1,101 @@
+import asyncio
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
 from loguru import logger
-from sqlalchemy import create_engine, inspect, text
+from sqlalchemy import create_engine, event, inspect, text, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.exc import DatabaseError
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, scoped_session, sessionmaker
+from sqlalchemy.orm.attributes import set_committed_value
+
+# WAL lets readers and the writer of several processes work side by side, NORMAL syncs only at checkpoints
+# and busy_timeout (ms) makes a blocked writer wait instead of failing with "database is locked"
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 30000,
+}
+# seconds save_later() waits to gather the updates of other wallets into the same transaction
+WRITE_BEHIND_INTERVAL = 0.3
+
+
+def task_scope():
+    """Scope of DB.session(): the running asyncio task, or the thread outside of an event loop."""
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    return task if task is not None else threading.get_ident()
 
 
 class DB:
-    def __init__(self, db_url: str, **kwargs):
+    def __init__(self, db_url: str, pragmas: dict | None = None, write_behind_interval: float = WRITE_BEHIND_INTERVAL, **kwargs):
         """
         Initializes a class.
 
         :param str db_url: a URL containing all the necessary parameters to connect to a DB
+        :param dict pragmas: SQLite pragmas set on every connection on top of SQLITE_PRAGMAS
+        :param float write_behind_interval: seconds save_later() gathers updates before committing them
         """
         self.db_url = db_url
         self.engine = create_engine(self.db_url, **kwargs)
+        if self.engine.dialect.name == "sqlite":
+            self.set_pragmas({**SQLITE_PRAGMAS, **(pragmas or {})})
+
         self.Base = None
-        self.s: Session = Session(bind=self.engine)
+        # the shared session loads the wallets and serves the synchronous menu utilities. Concurrent wallet tasks
+        # must not change its objects, a commit or rollback of one task would write or discard the changes of the
+        # others; they write with save() and save_later() instead, which go through task sessions.
+        # Without autoflush a read never takes the SQLite write lock for changes that are still pending.
+        self.s: Session = Session(bind=self.engine, autoflush=False)
         self.conn = self.engine.connect()
+        self.scoped = scoped_session(sessionmaker(bind=self.engine, expire_on_commit=False), scopefunc=task_scope)
+
+        self.write_behind_interval = write_behind_interval
+        self.write_stats = {"requested": 0, "commits": 0}
+        self._pending_updates: dict[tuple[type, tuple], dict] = {}
+        self._flusher: asyncio.Task | None = None
+
+    def set_pragmas(self, pragmas: dict) -> None:
+        """
+        Sets pragmas on every new connection of the engine.
+
+        :param dict pragmas: pragma names and values
+        """
+
+        @event.listens_for(self.engine, "connect")
+        def apply_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+            cursor.close()
+
+    @contextmanager
+    def session(self) -> Iterator[Session]:
+        """
+        Session of the current task, unlike the shared self.s it is never touched by other concurrent tasks.
+
+        Nested blocks of one task share the session; the outermost one commits it, or rolls it back on error,
+        and removes it.
+        """
+        session = self.scoped()
+        outermost = not session.info.get("depth")
+        session.info["depth"] = session.info.get("depth", 0) + 1
+
+        try:
+            yield session
+            if outermost:
+                session.commit()
+        except Exception:
+            if outermost:
+                session.rollback()
+            raise
+        finally:
+            session.info["depth"] -= 1
+            if outermost:
+                self.scoped.remove()
 
     def create_tables(self, base):
         """
@@ -51,7 +131,7 @@ class DB:
 
     def one(self, entities=None, *criterion, stmt=None, from_the_end: bool = False):
         """
-        Fetches one row.
+        Fetches one row, only that row is loaded from the DB.
 
         :param entities: an ORM entity
         :param stmt: stmt
@@ -59,18 +139,19 @@ class DB:
         :param from_the_end: get the row from the end
         :return list: found row or None
         """
-        if entities and criterion:
-            rows = self.all(entities, *criterion)
-        else:
-            rows = self.all(stmt=stmt)
-
-        if rows:
+        if stmt is not None:
             if from_the_end:
-                return rows[-1]
+                rows = self.all(stmt=stmt)
+                return rows[-1] if rows else None
+            return self.s.scalars(stmt.limit(1)).first()
 
-            return rows[0]
+        if not entities:
+            return None
 
-        return None
+        query = self.s.query(entities).filter(*criterion)
+        if from_the_end:
+            query = query.order_by(*[column.desc() for column in inspect(entities).primary_key])
+        return query.first()
 
     def execute(self, query, *args):
         """
@@ -94,6 +175,109 @@ class DB:
             logger.error(e)
             self.s.rollback()
 
+    @staticmethod
+    def _set_values(instance, values: dict) -> tuple:
+        """
+        Shows the values on the instance without marking it as changed in the shared session and returns its primary key.
+        """
+        for column, value in values.items():
+            set_committed_value(instance, column, value)
+        return tuple(getattr(instance, column.key) for column in inspect(type(instance)).primary_key)
+
+    def _write(self, updates: dict[tuple[type, tuple], dict]) -> None:
+        # ORM bulk UPDATE by primary key, all rows in one transaction of the task session
+        by_model: dict[type, list[dict]] = {}
+        for (model, key), values in updates.items():
+            primary_key = [column.key for column in inspect(model).primary_key]
+            by_model.setdefault(model, []).append({**dict(zip(primary_key, key)), **values})
+
+        with self.session() as session:
+            for model, rows in by_model.items():
+                session.execute(update(model), rows)
+
+    def save(self, instance, **values) -> None:
+        """
+        Writes column values of an ORM object right away, in the session of the current task.
+
+        :param instance: an ORM object, its attributes are updated as well
+        :param values: column values
+        """
+        key = self._set_values(instance, values)
+        self._write({(type(instance), key): values})
+
+    def save_later(self, instance, **values) -> None:
+        """
+        Writes column values of an ORM object within write_behind_interval, together with the values other coroutines
+        save meanwhile, so a single commit writes every wallet updated since the last one.
+
+        Falls back to save() outside of an event loop.
+
+        :param instance: an ORM object, its attributes are updated right away
+        :param values: column values
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.save(instance, **values)
+            return
+
+        key = self._set_values(instance, values)
+        self._pending_updates.setdefault((type(instance), key), {}).update(values)
+        self.write_stats["requested"] += 1
+        if self._flusher is None or self._flusher.done():
+            self._flusher = loop.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.write_behind_interval)
+        self.commit_pending()
+
+    def commit_pending(self):
+        """
+        Writes the values waiting for the write-behind flush right away.
+        """
+        if self._flusher is not None and not self._flusher.done() and self._flusher is not asyncio.current_task():
+            self._flusher.cancel()
+        self._flusher = None
+
+        if not self._pending_updates:
+            return
+
+        updates, self._pending_updates = self._pending_updates, {}
+        self.write_stats["commits"] += 1
+        try:
+            self._write(updates)
+        except DatabaseError as e:
+            logger.error(f"DB | write-behind of {len(updates)} rows failed: {e}")
+
+    def bulk_upsert(self, model, rows: list[dict], index_elements: list[str] | None = None, update_columns: list[str] | None = None) -> int:
+        """
+        Inserts rows or updates the existing ones in one INSERT ... ON CONFLICT DO UPDATE statement.
+
+        Objects already loaded into the shared session keep their old values until refreshed.
+
+        :param model: an ORM entity
+        :param list[dict] rows: column values of every row, all rows with the same columns
+        :param list[str] index_elements: unique columns that identify an existing row (default: primary key)
+        :param list[str] update_columns: columns overwritten on conflict (default: all given columns except index_elements)
+        :return int: the number of inserted or updated rows
+        """
+        if not rows:
+            return 0
+
+        index_elements = index_elements or [column.name for column in inspect(model).primary_key]
+        update_columns = update_columns or [column for column in rows[0] if column not in index_elements]
+
+        stmt = sqlite_insert(model)
+        if update_columns:
+            set_ = {column: stmt.excluded[column] for column in update_columns}
+            stmt = stmt.on_conflict_do_update(index_elements=index_elements, set_=set_)
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+
+        # executed on the connection of the task session, a Core executemany reports the affected rows
+        with self.session() as session:
+            return session.connection().execute(stmt, rows).rowcount
+
     def insert(self, row: object | list[object]):
         """
         Inserts rows.
@@ -0,0 +1,173 @@
+import asyncio
+import os
+import random
+import socket
+import time
+
+from loguru import logger
+from sqlalchemy import and_, delete, func, insert, or_, select, update
+
+from utils.db_api.models import Job
+from utils.db_api.wallet_api import db
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# a running job whose lease was not renewed for LEASE_TTL seconds is considered abandoned and leased again
+LEASE_TTL = 300
+HEARTBEAT_INTERVAL = 60
+IDLE_POLL_INTERVAL = 10
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobQueue:
+    """
+    Persistent queue of (wallet, action) jobs in the wallets database.
+
+    Every wallet of an action has one job row that moves pending -> running -> done/failed, or back to pending
+    with a later next_run_at for repeating actions. Workers lease the next due job atomically, so a killed process
+    leaves only its running jobs behind and a restart continues with the remaining ones on their own schedule.
+    """
+
+    def __init__(self, action: int, owner: str | None = None, lease_ttl: float = LEASE_TTL):
+        self.action = action
+        self.owner = owner or worker_id()
+        self.lease_ttl = lease_ttl
+
+    def sync(self, wallet_ids: list[int], shuffle: bool = False, next_run_at: dict[int, float] | None = None) -> int:
+        """
+        Creates jobs for new wallets and drops the ones of wallets no longer selected, existing progress is kept.
+
+        next_run_at maps wallet ids to the timestamp their new job becomes due, missing wallets are due at once.
+        """
+        next_run_at = next_run_at or {}
+
+        with db.engine.begin() as conn:
+            existing = set(conn.scalars(select(Job.wallet_id).where(Job.action == self.action)))
+
+            conn.execute(delete(Job).where(Job.action == self.action, Job.wallet_id.not_in(wallet_ids)))
+
+            new_ids = [wallet_id for wallet_id in wallet_ids if wallet_id not in existing]
+            if new_ids:
+                positions = self._positions(len(existing) + len(new_ids), shuffle)[len(existing) :]
+                conn.execute(
+                    insert(Job),
+                    [
+                        {
+                            "wallet_id": wallet_id,
+                            "action": self.action,
+                            "position": position,
+                            "next_run_at": next_run_at.get(wallet_id, 0.0),
+                        }
+                        for wallet_id, position in zip(new_ids, positions)
+                    ],
+                )
+
+        return len(new_ids)
+
+    def requeue_stale(self, owner: str | None = None) -> int:
+        """
+        Puts running jobs back to pending: those of the given owner, or else only those whose lease expired.
+
+        Running jobs with a live lease may belong to the worker processes of a sharded run and are left alone.
+        """
+        criteria = [Job.action == self.action, Job.status == RUNNING]
+        if owner is not None:
+            criteria.append(Job.lease_owner == owner)
+        else:
+            criteria.append(Job.lease_expires_at < time.time())
+
+        with db.engine.begin() as conn:
+            return conn.execute(update(Job).where(*criteria).values(status=PENDING, lease_owner=None, lease_expires_at=0.0)).rowcount
+
+    def lease(self) -> Job | None:
+        now = time.time()
+        due = or_(
+            and_(Job.status == PENDING, Job.next_run_at <= now),
+            and_(Job.status == RUNNING, Job.lease_expires_at < now),
+        )
+        next_job = select(Job.id).where(Job.action == self.action, due).order_by(Job.next_run_at, Job.position).limit(1).scalar_subquery()
+
+        with db.engine.begin() as conn:
+            row = conn.execute(
+                update(Job)
+                .where(Job.id == next_job, due)
+                .values(status=RUNNING, lease_owner=self.owner, lease_expires_at=now + self.lease_ttl, attempts=Job.attempts + 1)
+                .returning(Job.id, Job.wallet_id, Job.attempts)
+            ).first()
+
+        if row is None:
+            return None
+        return Job(id=row.id, wallet_id=row.wallet_id, action=self.action, status=RUNNING, attempts=row.attempts, lease_owner=self.owner)
+
+    def renew(self, job: Job) -> bool:
+        with db.engine.begin() as conn:
+            renewed = conn.execute(
+                update(Job)
+                .where(Job.id == job.id, Job.status == RUNNING, Job.lease_owner == self.owner)
+                .values(lease_expires_at=time.time() + self.lease_ttl)
+            ).rowcount
+        return bool(renewed)
+
+    async def keep_alive(self, job: Job) -> None:
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            # off the event loop, see run_jobs in functions/activity.py
+            if not await asyncio.to_thread(self.renew, job):
+                logger.warning(f"Job queue | lease of {job} was taken over by another worker")
+                return
+
+    def finish(self, job: Job, status: str = DONE) -> None:
+        with db.engine.begin() as conn:
+            conn.execute(
+                update(Job)
+                .where(Job.id == job.id, Job.lease_owner == self.owner)
+                .values(status=status, lease_owner=None, lease_expires_at=0.0)
+            )
+
+    def reschedule(self, job: Job, next_run_at: float) -> None:
+        """Releases a finished job as pending again, due at next_run_at."""
+        with db.engine.begin() as conn:
+            conn.execute(
+                update(Job)
+                .where(Job.id == job.id, Job.lease_owner == self.owner)
+                .values(status=PENDING, next_run_at=next_run_at, lease_owner=None, lease_expires_at=0.0, attempts=0)
+            )
+
+    def drop(self, job: Job) -> None:
+        """Deletes a leased job, for wallets that no longer exist."""
+        with db.engine.begin() as conn:
+            conn.execute(delete(Job).where(Job.id == job.id, Job.lease_owner == self.owner))
+
+    def clear(self) -> None:
+        with db.engine.begin() as conn:
+            conn.execute(delete(Job).where(Job.action == self.action))
+
+    def counts(self) -> dict[str, int]:
+        with db.engine.connect() as conn:
+            rows = conn.execute(select(Job.status, func.count()).where(Job.action == self.action).group_by(Job.status))
+            return {status: count for status, count in rows}
+
+    def is_cycle_done(self) -> bool:
+        counts = self.counts()
+        return not counts.get(PENDING) and not counts.get(RUNNING)
+
+    def seconds_until_due(self) -> float | None:
+        """Seconds until the earliest pending job is due, None when nothing is pending."""
+        with db.engine.connect() as conn:
+            next_run_at = conn.scalar(select(func.min(Job.next_run_at)).where(Job.action == self.action, Job.status == PENDING))
+        if next_run_at is None:
+            return None
+        return max(next_run_at - time.time(), 0.0)
+
+    @staticmethod
+    def _positions(count: int, shuffle: bool) -> list[int]:
+        positions = list(range(count))
+        if shuffle:
+            random.shuffle(positions)
+        return positions
@@ -1,3 +1,4 @@
+from sqlalchemy import UniqueConstraint
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 from data.constants import PROJECT_SHORT_NAME
@@ -28,8 +29,30 @@ class Wallet(Base):
     volume_portal: Mapped[int] = mapped_column(default=0)
     invite_code: Mapped[str] = mapped_column(default="")
     completed: Mapped[bool] = mapped_column(default=False)
+    sol_balance: Mapped[float] = mapped_column(default=0.0)
+    usdc_balance: Mapped[float] = mapped_column(default=0.0)
+    usdt_balance: Mapped[float] = mapped_column(default=0.0)
+    next_run_at: Mapped[float] = mapped_column(default=0.0)
 
     def __repr__(self):
         if Settings().show_wallet_address_logs:
             return f"[{PROJECT_SHORT_NAME} | {self.id} | {self.address}]"
         return f"[{PROJECT_SHORT_NAME} | {self.id}]"
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (UniqueConstraint("wallet_id", "action"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    wallet_id: Mapped[int] = mapped_column(index=True)
+    action: Mapped[int] = mapped_column(index=True)
+    status: Mapped[str] = mapped_column(default="pending")
+    position: Mapped[int] = mapped_column(default=0)
+    next_run_at: Mapped[float] = mapped_column(default=0.0)
+    lease_owner: Mapped[str] = mapped_column(default=None, nullable=True)
+    lease_expires_at: Mapped[float] = mapped_column(default=0.0)
+    attempts: Mapped[int] = mapped_column(default=0)
+
+    def __repr__(self):
+        return f"[job | {self.action} | wallet {self.wallet_id} | {self.status}]"
@@ -1,17 +1,25 @@
+import multiprocessing
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
 from types import SimpleNamespace
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
 
 from loguru import logger
+from sqlalchemy import select
 
+from data import config
 from data.config import FILES_DIR
 from data.settings import Settings
 from libs.sol_async_py.client import Client
-from libs.sol_async_py.data.models import Networks
 from utils.db_api.models import Wallet
-from utils.db_api.wallet_api import db, get_wallet_by_address
-from utils.encryption import check_encrypt_param, get_private_key, prk_encrypt
+from utils.db_api.wallet_api import db
+from utils.encryption import check_encrypt_param, get_private_key, preload_private_keys, prk_encrypt, set_cipher_key
+
+# imports of at least this many keys are decoded and encrypted in worker processes, smaller ones in-process
+IMPORT_POOL_THRESHOLD = 1000
+IMPORT_CHUNK_SIZE = 256
 
 
 def parse_proxy(proxy: str | None) -> Optional[str]:
@@ -37,26 +45,26 @@ def pick_proxy(proxies: list, i: int) -> Optional[str]:
     return proxies[i % len(proxies)]
 
 
-def remove_line_from_file(value: str, filename: str) -> bool:
+def remove_lines_from_file(values: set[str], filename: str) -> int:
+    """Drops all lines matching one of the values with a single rewrite of the file, returns how many were dropped."""
     file_path = os.path.join(FILES_DIR, filename)
 
     if not os.path.isfile(file_path):
-        return False
+        return 0
 
     with open(file_path, encoding="utf-8") as f:
         lines = [line.rstrip("\n") for line in f]
 
-    original_len = len(lines)
-
-    keep = [line for line in lines if line.strip() != value.strip()]
+    values = {value.strip() for value in values}
+    keep = [line for line in lines if line.strip() not in values]
 
-    if len(keep) == original_len:
-        return False
+    if len(keep) == len(lines):
+        return 0
 
     with open(file_path, "w", encoding="utf-8") as f:
         for line in keep:
             f.write(line + "\n")
-    return True
+    return len(lines) - len(keep)
 
 
 def read_lines(path: str) -> List[str]:
@@ -67,6 +75,34 @@ def read_lines(path: str) -> List[str]:
         return [line.strip() for line in f if line.strip()]
 
 
+def _init_import_worker(cipher_key: bytes | None) -> None:
+    from utils.pyarmor_bootstrap import ensure_pyarmor_runtime_on_path
+
+    ensure_pyarmor_runtime_on_path()
+
+    if cipher_key is not None:
+        set_cipher_key(cipher_key)
+
+
+def prepare_key(private_key: str) -> tuple[str, str]:
+    """Address of a key from private_keys.txt and the form it is stored in, encrypted if enabled."""
+    decoded_private_key = get_private_key(private_key)
+    address = str(Client.load_keypair(decoded_private_key).pubkey())
+    return address, private_key if "gAAAA" in private_key else prk_encrypt(decoded_private_key)
+
+
+def prepare_keys(private_keys: List[str], processes: int | None = None) -> Iterator[tuple[str, str]]:
+    """prepare_key for every key in order, spread over worker processes for large imports."""
+    if len(private_keys) < IMPORT_POOL_THRESHOLD:
+        yield from map(prepare_key, private_keys)
+        return
+
+    context = multiprocessing.get_context("spawn")
+    pool = ProcessPoolExecutor(max_workers=processes, mp_context=context, initializer=_init_import_worker, initargs=(config.CIPHER_KEY,))
+    with pool:
+        yield from pool.map(prepare_key, private_keys, chunksize=IMPORT_CHUNK_SIZE)
+
+
 class Import:
     @staticmethod
     def parse_wallet_from_txt() -> List[Dict[str, Optional[str]]]:
@@ -93,7 +129,9 @@ class Import:
 
     @staticmethod
     async def wallets():
-        check_encrypt_param(confirm=True)
+        if not check_encrypt_param(confirm=True):
+            logger.error("Decryption Failed | Wrong Password")
+            return
 
         raw_wallets = Import.parse_wallet_from_txt()
 
@@ -101,76 +139,46 @@ class Import:
 
         wallets = [SimpleNamespace(**w) for w in raw_wallets]
 
-        imported: list[Wallet] = []
-        edited: list[Wallet] = []
+        imported: list[str] = []
+        edited: list[str] = []
         total = len(wallets)
 
-        check_wallets = db.all(Wallet)
+        check_wallet = db.one(Wallet)
 
-        if len(check_wallets) > 0:
+        if check_wallet:
             # Check pwd1
             try:
-                check_wallet = check_wallets[0]
                 get_private_key(check_wallet.private_key)
 
             except Exception as e:
                 sys.exit(f"Database not empty | You must use same password for new wallets | {e}")
 
-        for wl in wallets:
-            decoded_private_key = get_private_key(wl.private_key)
-
-            client = Client(private_key=decoded_private_key, network=Networks.Solana)
-
-            wallet_instance = get_wallet_by_address(address=str(client.account.pubkey()))
+        started = perf_counter()
 
-            if wallet_instance:
-                changed = False
+        # one query over the unique address index instead of one lookup per imported key
+        existing = set(db.s.scalars(select(Wallet.address)))
+        rows: dict[str, dict] = {}
 
-                if wallet_instance.address == str(client.account.pubkey()):
-                    wallet_instance.private_key = prk_encrypt(decoded_private_key) if not "gAAAA" in wl.private_key else wl.private_key
-                    changed = True
+        for wl, (address, private_key) in zip(wallets, prepare_keys([wl.private_key for wl in wallets])):
+            rows[address] = {
+                "private_key": private_key,
+                "address": address,
+                "proxy": wl.proxy,
+                "deposit_address": wl.deposit_address,
+            }
 
-                if wallet_instance.proxy != wl.proxy:
-                    wallet_instance.proxy = wl.proxy
-                    changed = True
+        for address in rows:
+            if address in existing:
+                edited.append(address)
+            else:
+                imported.append(address)
 
-                if hasattr(wallet_instance, "deposit_address") and wallet_instance.deposit_address != wl.deposit_address:
-                    wallet_instance.deposit_address = wl.deposit_address
-                    changed = True
-                #
-                # if hasattr(wallet_instance, "discord_token") and wallet_instance.discord_token != wl.discord_token:
-                #     wallet_instance.discord_token = wl.discord_token
-                #     changed = True
+        # inserts the new wallets and updates key, proxy and deposit address of the known ones in one transaction
+        db.bulk_upsert(Wallet, list(rows.values()), index_elements=["address"])
+        db.s.expire_all()
 
-                if changed:
-                    db.commit()
-                    edited.append(wallet_instance)
-                    remove_line_from_file(wl.private_key, "private_keys.txt")
-
-                continue
-
-            wallet_instance = Wallet(
-                private_key=prk_encrypt(wl.private_key) if not "gAAAA" in wl.private_key else wl.private_key,
-                address=str(client.account.pubkey()),
-                proxy=wl.proxy,
-                deposit_address=wl.deposit_address,
-                # discord_token=wl.discord_token,
-            )
-
-            remove_line_from_file(wl.private_key, "private_keys.txt")
-
-            # if not wallet_instance.twitter_token:
-            #     logger.warning(
-            #         f"{wallet_instance.id} | {wallet_instance.address} | Twitter Token not found, Twitter Action will be skipped"
-            #     )
-            #
-            # if not wallet_instance.discord_token:
-            #     logger.warning(
-            #         f"{wallet_instance.id} | {wallet_instance.address} | Discord Token not found, Discord Action will be skipped"
-            #     )
-
-            db.insert(wallet_instance)
-            imported.append(wallet_instance)
+        remove_lines_from_file({wl.private_key for wl in wallets}, "private_keys.txt")
+        logger.debug(f"Import | {total} keys processed in {perf_counter() - started:.2f}s")
 
         logger.success(f"Done! imported wallets: {len(imported)}/{total}; edited wallets: {len(edited)}/{total}; total: {total}")
 
@@ -221,28 +229,23 @@ class Sync:
         logger.info(f"Start syncing wallets: {total}")
 
         edited: list[Wallet] = []
-        for wl in wallets:
-            decoded_private_key = get_private_key(wl.private_key)
-
-            client = Client(private_key=decoded_private_key, network=Networks.Solana)
-
-            wallet_instance = get_wallet_by_address(address=str(client.account.pubkey()))
+        for wallet_instance in wallets:
+            changed = False
 
-            if wallet_instance:
-                changed = False
+            wallet_data = wallet_auxiliary_data[wallet_instance.id - 1]
+            if wallet_instance.proxy != wallet_data.proxy:
+                wallet_instance.proxy = wallet_data.proxy
+                changed = True
 
-                wallet_data = wallet_auxiliary_data[wallet_instance.id - 1]
-                if wallet_instance.proxy != wallet_data.proxy:
-                    wallet_instance.proxy = wallet_data.proxy
-                    changed = True
+            if hasattr(wallet_instance, "deposit_address") and wallet_instance.deposit_address != wallet_data.deposit_address:
+                wallet_instance.deposit_address = wallet_data.deposit_address
+                changed = True
 
-                if hasattr(wallet_instance, "deposit_address") and wallet_instance.deposit_address != wallet_data.deposit_address:
-                    wallet_instance.twitter_token = wallet_data.deposit_address
-                    changed = True
+            if changed:
+                edited.append(wallet_instance)
 
-                if changed:
-                    db.commit()
-                    edited.append(wallet_instance)
+        # the changes of all wallets are written in one transaction
+        db.commit()
 
         logger.success(f"Done! edited wallets: {len(edited)}/{total}; total: {total}")
 
@@ -274,6 +277,7 @@ class Export:
             return
 
         buf = {key: [] for key in Export._FILES.keys()}
+        preload_private_keys([w.private_key for w in wallets])
 
         for w in wallets:
             prk = get_private_key(w.private_key) if Settings().private_key_encryption else w.private_key
@@ -11,21 +11,33 @@ from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from loguru import logger
 
 from data import config
-from data.config import SALT_PATH
+from data.config import PASSWORD_ENV, PASSWORD_FILE_ENV, SALT_PATH
 from data.settings import Settings
+from libs.sol_async_py.keypairs import keypair_cache
 from utils.db_api.models import Wallet
 from utils.db_api.wallet_api import db
+from utils.key_vault import key_vault
+
+# Fernet keys by (sha256 of the password, salt), the 100k PBKDF2 iterations run once per password and process
+_derived_keys: dict[tuple[bytes, bytes | None], bytes] = {}
 
 
 def _derive_fernet_key(password: bytes, salt=None) -> bytes:
     try:
+        cache_key = (hashlib.sha256(password).digest(), salt)
+        if cache_key in _derived_keys:
+            return _derived_keys[cache_key]
+
         if salt:
             kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=salt, iterations=100000, backend=default_backend())
-            return base64.urlsafe_b64encode(kdf.derive(password))
+            key = base64.urlsafe_b64encode(kdf.derive(password))
 
         else:
             digest = hashlib.sha256(password).digest()
-            return base64.urlsafe_b64encode(digest)
+            key = base64.urlsafe_b64encode(digest)
+
+        _derived_keys[cache_key] = key
+        return key
 
     except TypeError:
         logger.error("Error! Check salt file! Salt must be bites string")
@@ -34,26 +46,37 @@ def _derive_fernet_key(password: bytes, salt=None) -> bytes:
 
 def set_cipher_suite(password) -> None:
     if Settings().private_key_encryption:
-        cipher = Fernet(_derive_fernet_key(password))
-
         if not os.path.exists(SALT_PATH):
-            cipher = Fernet(_derive_fernet_key(password))
-
-            config.CIPHER_SUITE = cipher
+            set_cipher_key(_derive_fernet_key(password))
 
         else:
             with open(SALT_PATH, "rb") as f:
                 salt = f.read()
 
-            cipher = Fernet(_derive_fernet_key(password, salt))
-            config.CIPHER_SUITE = cipher
+            set_cipher_key(_derive_fernet_key(password, salt))
+
+
+def forget_private_keys() -> None:
+    """Drops the decrypted keys and the keypairs parsed from them, one without the other would keep the keys in memory."""
+    key_vault.clear()
+    keypair_cache.clear()
+
+
+def set_cipher_key(key: bytes) -> None:
+    """Installs an already derived Fernet key, worker processes get it from the parent instead of a password."""
+    if key != config.CIPHER_KEY:
+        # keys decrypted with another password must not outlive it
+        forget_private_keys()
+    config.CIPHER_KEY = key
+    config.CIPHER_SUITE = Fernet(key)
 
 
 def get_private_key(enc_value: str) -> str:
+    """Plaintext of a stored key, encrypted keys are decrypted once and then served from the key vault."""
     try:
         if Settings().private_key_encryption:
             if "gAAAA" in enc_value:
-                return config.CIPHER_SUITE.decrypt(enc_value.encode()).decode()
+                return key_vault.decrypt(enc_value)
 
         return enc_value
     except Exception:
@@ -69,10 +92,47 @@ def prk_encrypt(value: str) -> str:
     return value
 
 
+def password_from_env() -> bytes | None:
+    """Password of a headless run: PASSWORD_ENV, or the first line of the file named in PASSWORD_FILE_ENV."""
+    password = os.environ.get(PASSWORD_ENV)
+    if password is not None:
+        return password.strip().encode()
+
+    password_file = os.environ.get(PASSWORD_FILE_ENV)
+    if password_file:
+        with open(password_file, "rb") as f:
+            return f.readline().strip()
+
+    return None
+
+
+def unlock(password: bytes) -> bool:
+    """Installs the key of the password, False when it cannot decrypt the stored wallets."""
+    set_cipher_suite(password)
+    check_password_wallet = db.one(Wallet)
+    if not check_password_wallet:
+        return True
+
+    try:
+        # Should raise a specific error on wrong key
+        get_private_key(check_password_wallet.private_key)
+        return True
+    except Exception:
+        return False
+
+
 def check_encrypt_param(confirm: bool = False, attempts: int = 3):
     if not Settings().private_key_encryption:
         return True
 
+    password = password_from_env()
+    if password is not None:
+        return bool(password) and unlock(password)
+
+    if not sys.stdin.isatty():
+        logger.error(f"No terminal to ask the password, set {PASSWORD_ENV} or {PASSWORD_FILE_ENV}")
+        return False
+
     for try_num in range(1, attempts + 1):
         pwd1 = getpass.getpass("[DECRYPTOR] Enter password (input hidden): ").strip().encode()
 
@@ -87,17 +147,15 @@ def check_encrypt_param(confirm: bool = False, attempts: int = 3):
             print("Password cannot be empty.\n")
             continue
 
-        set_cipher_suite(pwd1)
-        check_password_wallet = db.one(Wallet, Wallet.id == 1)
-        if check_password_wallet:
-            try:
-                # Should raise a specific error on wrong key
-                get_private_key(check_password_wallet.private_key)
-                return True
-            except Exception:
-                print(f"Invalid password (attempt {try_num}/{attempts})\n")
-                continue
-        else:
+        if unlock(pwd1):
             return True
+        print(f"Invalid password (attempt {try_num}/{attempts})\n")
 
     raise RuntimeError("Password confirmation failed – too many attempts.")
+
+
+def preload_private_keys(enc_values: list[str]) -> int:
+    """Decrypts the encrypted keys of many wallets at once on the key vault thread pool."""
+    if not Settings().private_key_encryption:
+        return 0
+    return key_vault.preload([value for value in enc_values if "gAAAA" in value])
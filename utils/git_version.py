@@ -1,15 +1,31 @@
+import asyncio
 import json
 import os
 import platform
 import sys
+import threading
+import time
+from dataclasses import dataclass
 from datetime import datetime, timezone
 from typing import Optional, Tuple
 
-import git
 from loguru import logger
 
 from data.settings import Settings
-from utils.browser import Browser
+from utils.browser import Browser, SessionPool
+
+# the whole remote lookup (GitHub API and git fetch) is abandoned after this many seconds
+UPDATE_CHECK_TIMEOUT = 15
+UPDATE_CACHE_FILE = "files/update_check.json"
+
+
+@dataclass
+class UpdateInfo:
+    latest_hash: str
+    latest_date: str
+    latest_message: str
+    repo_url: str
+    is_git_repo: bool
 
 
 def get_local_commit(repo_path: str = ".") -> Tuple[Optional[str], Optional[str], Optional[str]]:
@@ -21,6 +37,8 @@ def get_local_commit(repo_path: str = ".") -> Tuple[Optional[str], Optional[str]
     Returns:
         Tuple containing (commit_hash, commit_date, commit_message) or (None, None, None) if not a Git repo.
     """
+    import git
+
     try:
         repo = git.Repo(repo_path)
         head_commit = repo.head.commit
@@ -34,21 +52,26 @@ def get_local_commit(repo_path: str = ".") -> Tuple[Optional[str], Optional[str]
         return None, None, None
 
 
-def get_latest_commit_from_git(repo_path: str = ".", remote_name: str = "origin") -> Tuple[Optional[str], Optional[str], Optional[str]]:
+def get_latest_commit_from_git(
+    repo_path: str = ".", remote_name: str = "origin", timeout: float | None = None
+) -> Tuple[Optional[str], Optional[str], Optional[str]]:
     """
     Fetches the latest commit information from a remote Git repository using gitpython.
 
     Args:
         repo_path: Path to the Git repository (default: current directory).
         remote_name: Name of the remote (default: "origin").
+        timeout: Seconds after which the git fetch is killed (default: no limit).
 
     Returns:
         Tuple containing (commit_hash, commit_date, commit_message) or (None, None, None) on error.
     """
+    import git
+
     try:
         repo = git.Repo(repo_path)
         remote = repo.remotes[remote_name]
-        remote.fetch()
+        remote.fetch(kill_after_timeout=timeout)
 
         remote_head = repo.refs[f"{remote_name}/{repo.active_branch.name}"]
         commit = repo.commit(remote_head)
@@ -63,9 +86,11 @@ def get_latest_commit_from_git(repo_path: str = ".", remote_name: str = "origin"
         return None, None, None
 
 
-async def get_latest_commit_from_api(repo_owner: str, repo_name: str) -> Tuple[Optional[str], Optional[str], Optional[str], bool]:
+async def get_latest_commit_from_api(
+    repo_owner: str, repo_name: str, pool: SessionPool | None = None
+) -> Tuple[Optional[str], Optional[str], Optional[str], bool]:
     headers = {"Accept": "application/vnd.github.v3+json"}
-    browser = Browser()
+    browser = Browser(pool=pool)
     try:
         repo_url = f"https://api.github.com/repos/{repo_owner}/{repo_name}"
         response = await browser.get(url=repo_url, headers=headers)
@@ -145,6 +170,8 @@ def perform_git_pull(repo_path: str = ".", remote_name: str = "origin") -> bool:
     Returns:
         True if the pull was successful, False otherwise.
     """
+    import git
+
     try:
         repo = git.Repo(repo_path)
         remote = repo.remotes[remote_name]
@@ -169,17 +196,91 @@ def restart_program():
     os.execv(python, [python] + sys.argv)
 
 
+def read_update_cache(cache_file: str = UPDATE_CACHE_FILE, max_age: float = 0) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """
+    Reads the latest remote commit saved by the last update check.
+
+    Args:
+        cache_file: Path to the cache file (default: "files/update_check.json").
+        max_age: Seconds after which the cached commit is considered stale.
+
+    Returns:
+        Tuple containing (commit_hash, commit_date, commit_message) or (None, None, None) if missing or stale.
+    """
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if time.time() - data.get("checked_at", 0) > max_age:
+            return None, None, None
+        return data.get("hash"), data.get("date"), data.get("message")
+    except FileNotFoundError:
+        return None, None, None
+    except Exception as e:
+        logger.debug(f"Error reading update cache from {cache_file}: {e}")
+        return None, None, None
+
+
+def save_update_cache(commit_hash: str, commit_date: str, commit_message: str, cache_file: str = UPDATE_CACHE_FILE) -> None:
+    try:
+        with open(cache_file, "w", encoding="utf-8") as f:
+            json.dump({"checked_at": time.time(), "hash": commit_hash, "date": commit_date, "message": commit_message}, f, indent=2)
+    except Exception as e:
+        logger.debug(f"Error saving update cache to {cache_file}: {e}")
+
+
+async def fetch_latest_commit(
+    repo_owner: str,
+    repo_name: str,
+    is_git_repo: bool,
+    repo_path: str = ".",
+    remote_name: str = "origin",
+    timeout: float = UPDATE_CHECK_TIMEOUT,
+) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """
+    Looks up the latest remote commit through the GitHub API, or through git fetch for private repositories.
+
+    Returns:
+        Tuple containing (commit_hash, commit_date, commit_message) or (None, None, None) on error or timeout.
+    """
+    pool = SessionPool()
+    try:
+        latest_hash, latest_date, latest_message, is_private = await asyncio.wait_for(
+            get_latest_commit_from_api(repo_owner, repo_name, pool=pool), timeout=timeout
+        )
+    except asyncio.TimeoutError:
+        logger.debug(f"Update check timed out after {timeout} seconds")
+        return None, None, None
+    finally:
+        await pool.close_all()
+
+    if is_private and is_git_repo:
+        logger.debug("Fetching updates from remote...")
+        latest_hash, latest_date, latest_message = get_latest_commit_from_git(repo_path, remote_name, timeout=timeout)
+        if not latest_hash:
+            logger.warning(
+                "Warning: Failed to fetch updates via Git. Ensure SSH/HTTPS credentials are configured for private repositories."
+            )
+
+    return latest_hash, latest_date, latest_message
+
+
+def format_commit_date(commit_date: str) -> str:
+    return datetime.fromisoformat(commit_date.replace("Z", "+00:00")).strftime("%d.%m.%Y %H:%M UTC")
+
+
 async def check_for_updates(
     repo_name: str,
     repo_owner: str = "Phoenix0x-web3",
     version_file: str = "files/version.json",
     repo_path: str = ".",
     remote_name: str = "origin",
-) -> None:
+    cache_file: str = UPDATE_CACHE_FILE,
+) -> Optional[UpdateInfo]:
     """
     Checks for updates using gitpython if a Git repo exists, otherwise falls back to GitHub API via Browser.
-    Notifies the user if a newer version is available. On first run, saves local HEAD commit for Git repos.
-    For Git repos, prompts to perform git pull and restarts the program if user agrees.
+    The latest remote commit is cached in cache_file, so the network is asked at most once per
+    check_git_updates_interval_hours. On first run, saves local HEAD commit for Git repos.
+    Never prompts, see offer_update for applying the result.
 
     Args:
         repo_name: The name of the repository.
@@ -187,95 +288,131 @@ async def check_for_updates(
         version_file: Path to the version file (default: "files/version.json").
         repo_path: Path to the Git repository (default: current directory).
         remote_name: Name of the remote (default: "origin").
+        cache_file: Path to the cache of the latest remote commit (default: "files/update_check.json").
+
+    Returns:
+        UpdateInfo if a newer version is available, otherwise None.
     """
-    if not Settings().check_git_updates:
-        return
+    settings = Settings()
+    if not settings.check_git_updates:
+        return None
 
     repo_name = repo_name.strip().lower().replace(" ", "_")
-
-    logger.debug(f"Checking for updates in {repo_owner}/{repo_name}")
-
     is_git_repo = os.path.exists(os.path.join(repo_path, ".git"))
-    latest_hash = None
-    latest_date = None
-    latest_message = None
     local_hash = None
     local_date = None
 
-    latest_hash, latest_date, latest_message, is_private = await get_latest_commit_from_api(repo_owner, repo_name)
     if is_git_repo:
         logger.debug("Detected Git repository. Fetching local HEAD commit...")
         local_hash, local_date, _ = get_local_commit(repo_path)
-        logger.debug("Fetching updates from remote...")
-        if is_private:
-            latest_hash, latest_date, latest_message = get_latest_commit_from_git(repo_path, remote_name)
-            if not latest_hash:
-                logger.warning(
-                    "Warning: Failed to fetch updates via Git. Ensure SSH/HTTPS credentials are configured for private repositories."
-                )
-            if local_hash == latest_hash:
-                latest_dt = datetime.fromisoformat(latest_date.replace("Z", "+00:00"))
-                formatted_date = latest_dt.strftime("%d.%m.%Y %H:%M UTC")
-                logger.info(f"You are using the latest version (commit from {formatted_date})")
-                return
     else:
         logger.debug("No Git repository detected (possibly downloaded as ZIP). Using GitHub API for update check.")
 
+    max_age = settings.check_git_updates_interval_hours * 3600
+    latest_hash, latest_date, latest_message = read_update_cache(cache_file, max_age=max_age)
+    if latest_hash:
+        logger.debug(f"Using cached update check result: {latest_hash}")
+    else:
+        logger.debug(f"Checking for updates in {repo_owner}/{repo_name}")
+        latest_hash, latest_date, latest_message = await fetch_latest_commit(repo_owner, repo_name, is_git_repo, repo_path, remote_name)
+        if latest_hash and latest_date:
+            save_update_cache(latest_hash, latest_date, latest_message, cache_file)
+
     if not latest_hash or not latest_date:
-        return
+        return None
+
+    if is_git_repo and local_hash == latest_hash:
+        logger.info(f"You are using the latest version (commit from {format_commit_date(latest_date)})")
+        return None
 
     local_version_hash, local_version_date = read_local_version(version_file)
 
     if not local_version_hash or not local_version_date:
         if is_git_repo and local_hash and local_date:
             save_local_version(local_hash, local_date, version_file)
-            if local_hash == latest_hash:
-                latest_dt = datetime.fromisoformat(latest_date.replace("Z", "+00:00"))
-                formatted_date = latest_dt.strftime("%d.%m.%Y %H:%M UTC")
-                logger.debug(f"You are using the latest version (commit from {formatted_date})")
-                return
         else:
             # For non-Git (e.g., ZIP), initialize with latest remote commit
             save_local_version(latest_hash, latest_date, version_file)
-            latest_dt = datetime.fromisoformat(latest_date.replace("Z", "+00:00"))
-            formatted_date = latest_dt.strftime("%d.%m.%Y %H:%M UTC")
-            logger.debug(f"Initializing version tracking: {formatted_date} (commit {latest_hash})")
-            return
+            logger.debug(f"Initializing version tracking: {format_commit_date(latest_date)} (commit {latest_hash})")
+            return None
+
+    elif local_version_hash == latest_hash:
+        logger.info(f"You are using the latest version (commit from {format_commit_date(latest_date)})")
+        return None
+
+    logger.warning(f"Update available: {latest_hash} from {format_commit_date(latest_date)}")
+    return UpdateInfo(
+        latest_hash=latest_hash,
+        latest_date=latest_date,
+        latest_message=latest_message,
+        repo_url=f"https://github.com/{repo_owner}/{repo_name}",
+        is_git_repo=is_git_repo,
+    )
 
-    if local_version_hash == latest_hash:
-        latest_dt = datetime.fromisoformat(latest_date.replace("Z", "+00:00"))
-        formatted_date = latest_dt.strftime("%d.%m.%Y %H:%M UTC")
-        logger.info(f"You are using the latest version (commit from {formatted_date})")
-        return
 
-    # Update available
-    latest_dt = datetime.fromisoformat(latest_date.replace("Z", "+00:00"))
-    formatted_date = latest_dt.strftime("%d.%m.%Y %H:%M UTC")
-    repo_url = f"https://github.com/{repo_owner}/{repo_name}"
+def offer_update(info: UpdateInfo, version_file: str = "files/version.json", repo_path: str = ".", remote_name: str = "origin") -> None:
+    """
+    Shows an available update. For Git repos, prompts to perform git pull and restarts the program if user agrees.
+    """
     print(
         f"Update available!\n"
-        f"Latest update: {formatted_date} (commit {latest_hash})\n"
-        f"Commit message: {latest_message}\n"
+        f"Latest update: {format_commit_date(info.latest_date)} (commit {info.latest_hash})\n"
+        f"Commit message: {info.latest_message}\n"
         f"Use: git pull (if cloned via Git)\n"
-        f"Or download update: {repo_url}"
+        f"Or download update: {info.repo_url}"
     )
-    logger.warning(f"Update available: {latest_hash} from {formatted_date}")
 
-    if is_git_repo:
-        while True:
-            response = input("Perform update y/N? ").strip().lower()
-            if response in ("y", "n", ""):
-                break
-            print("Please enter 'y' or 'n'.")
-
-        if response == "y":
-            if perform_git_pull(repo_path, remote_name):
-                save_local_version(latest_hash, latest_date, version_file)
-                print("Update successful. Restarting program...")
-                restart_program()
-            else:
-                print("Update failed. Continuing with current version.")
+    if not info.is_git_repo:
+        save_local_version(info.latest_hash, info.latest_date, version_file)
+        return
+
+    while True:
+        response = input("Perform update y/N? ").strip().lower()
+        if response in ("y", "n", ""):
+            break
+        print("Please enter 'y' or 'n'.")
+
+    if response == "y":
+        if perform_git_pull(repo_path, remote_name):
+            save_local_version(info.latest_hash, info.latest_date, version_file)
+            print("Update successful. Restarting program...")
+            restart_program()
         else:
-            print("Update skipped. Continuing with current version.")
+            print("Update failed. Continuing with current version.")
     else:
-        save_local_version(latest_hash, latest_date, version_file)
+        print("Update skipped. Continuing with current version.")
+
+
+class BackgroundUpdateCheck:
+    """
+    Runs check_for_updates in a daemon thread with its own event loop.
+
+    The interactive menu blocks the main event loop while it waits for input, so the check cannot be a task
+    there; the thread lets the menu and headless runs start at once and the result is offered between actions.
+    """
+
+    def __init__(self, repo_name: str, **kwargs):
+        self.repo_name = repo_name
+        self.kwargs = kwargs
+        self.info: Optional[UpdateInfo] = None
+        self._done = threading.Event()
+        self._offered = False
+
+    def start(self) -> "BackgroundUpdateCheck":
+        threading.Thread(target=self._run, name="update-check", daemon=True).start()
+        return self
+
+    def _run(self) -> None:
+        try:
+            self.info = asyncio.run(check_for_updates(self.repo_name, **self.kwargs))
+        except Exception as e:
+            logger.debug(f"Update check failed: {repr(e)}")
+        finally:
+            self._done.set()
+
+    def offer(self) -> None:
+        """Offers a found update once, does nothing while the check is still running."""
+        if self._offered or not self._done.is_set() or self.info is None:
+            return
+        self._offered = True
+        offer_update(self.info, **{key: value for key, value in self.kwargs.items() if key in ("version_file", "repo_path", "remote_name")})
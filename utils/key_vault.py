@@ -0,0 +1,94 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from cryptography.fernet import InvalidToken
+
+from data import config
+
+# decrypted keys kept in memory, the least recently used ones are zeroized beyond that
+KEY_VAULT_CAPACITY = 10_000
+DECRYPT_WORKERS = 4
+
+
+def zeroize(buffer: bytearray) -> None:
+    buffer[:] = bytes(len(buffer))
+
+
+class KeyVault:
+    """
+    Decrypted private keys of the fleet, every encrypted key is decrypted with config.CIPHER_SUITE only once.
+
+    Plaintexts are cached as bytearrays in an LRU bounded to `capacity` keys and overwritten with zeros when they
+    are evicted or the vault is cleared. Only these cached buffers can be wiped, the str copies handed to callers
+    are regular Python objects.
+    """
+
+    def __init__(self, capacity: int = KEY_VAULT_CAPACITY, workers: int = DECRYPT_WORKERS):
+        self.capacity = capacity
+        self.workers = workers
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._keys: OrderedDict[str, bytearray] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _decrypt(token: str) -> bytearray:
+        try:
+            return bytearray(config.CIPHER_SUITE.decrypt(token.encode()))
+        except Exception:
+            raise InvalidToken(f"{token} | wrong password! Decrypt failed")
+
+    def _store(self, token: str, plaintext: bytearray) -> None:
+        with self._lock:
+            previous = self._keys.pop(token, None)
+            if previous is not None and previous is not plaintext:
+                zeroize(previous)
+
+            self._keys[token] = plaintext
+            while len(self._keys) > self.capacity:
+                _, evicted = self._keys.popitem(last=False)
+                zeroize(evicted)
+                self.evictions += 1
+
+    def decrypt(self, token: str) -> str:
+        with self._lock:
+            plaintext = self._keys.get(token)
+            if plaintext is not None:
+                self._keys.move_to_end(token)
+                self.hits += 1
+                return plaintext.decode()
+            self.misses += 1
+
+        plaintext = self._decrypt(token)
+        value = plaintext.decode()
+        self._store(token, plaintext)
+        return value
+
+    def preload(self, tokens: list[str]) -> int:
+        """Decrypts the keys that are not cached yet on a thread pool, at most `capacity` of them."""
+        with self._lock:
+            missing = [token for token in dict.fromkeys(tokens) if token not in self._keys][: self.capacity]
+
+        if not missing:
+            return 0
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="key-vault") as pool:
+            for token, plaintext in zip(missing, pool.map(self._decrypt, missing)):
+                self._store(token, plaintext)
+
+        return len(missing)
+
+    def clear(self) -> None:
+        with self._lock:
+            for plaintext in self._keys.values():
+                zeroize(plaintext)
+            self._keys.clear()
+
+    def stats(self) -> dict:
+        return {"keys": len(self._keys), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+key_vault = KeyVault()
@@ -0,0 +1,122 @@
+import asyncio
+from time import monotonic
+from urllib.parse import urlparse
+
+from data.settings import Settings
+
+# requests per second when settings have no rate_limits entry for the bucket kind. The rpc rate is the budget of the
+# wallets' requests, the shared background refreshers of an endpoint are not counted (see RpcClientPool)
+DEFAULT_RATE_LIMITS = {
+    "rpc": 10,
+    "proxy": 10,
+    "titan": 5,
+    "okx": 5,
+    "binance": 10,
+}
+
+# external APIs recognised by the request host
+API_HOSTS = {
+    "titan": "titan",
+    "okx.com": "okx",
+    "binance.com": "binance",
+}
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average with bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1)
+        self.tokens = self.capacity
+        self.waited = 0.0
+        self.acquired = 0
+
+        self._updated_at = monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self) -> None:
+        # the lock queues waiters in arrival order, so a burst of callers is spread out instead of polling the bucket
+        async with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                delay = (1 - self.tokens) / self.rate
+                self.waited += delay
+                await asyncio.sleep(delay)
+                self._refill()
+
+            self.tokens -= 1
+            self.acquired += 1
+
+
+class RateLimiter:
+    """
+    Token buckets shared by all wallets of the process.
+
+    There is one bucket per RPC endpoint, per proxy host and per external API. Every outgoing request
+    acquires from each bucket it goes through. Rates are requests per second from the rate_limits settings,
+    a rate of 0 disables the bucket.
+    """
+
+    def __init__(self):
+        self._buckets: dict[tuple[str, str], TokenBucket | None] = {}
+        self._overrides: dict[str, float] = {}
+
+    def set_rate(self, kind: str, rate: float) -> None:
+        """Overrides the settings rate of a bucket kind, existing buckets of that kind are recreated on next use."""
+        self._overrides[kind] = rate
+        for key in [key for key in self._buckets if key[0] == kind]:
+            del self._buckets[key]
+
+    @staticmethod
+    def host(url: str | None) -> str | None:
+        if not url:
+            return None
+        if "://" not in url:
+            url = f"http://{url}"
+        return urlparse(url).hostname
+
+    @classmethod
+    def api_for(cls, url: str | None) -> str | None:
+        host = cls.host(url) or ""
+        for marker, api in API_HOSTS.items():
+            if marker in host:
+                return api
+        return None
+
+    def bucket(self, kind: str, key: str) -> TokenBucket | None:
+        if (kind, key) not in self._buckets:
+            rate = self._overrides.get(kind, Settings().rate_limits.get(kind, DEFAULT_RATE_LIMITS.get(kind)))
+            self._buckets[(kind, key)] = TokenBucket(rate=rate) if rate else None
+        return self._buckets[(kind, key)]
+
+    async def acquire(self, rpc: str | None = None, proxy: str | None = None, url: str | None = None) -> None:
+        keys = []
+        if rpc:
+            keys.append(("rpc", rpc))
+        if proxy:
+            keys.append(("proxy", self.host(proxy)))
+
+        api = self.api_for(url)
+        if api:
+            keys.append((api, api))
+
+        for kind, key in keys:
+            bucket = self.bucket(kind, key)
+            if bucket is not None:
+                await bucket.acquire()
+
+    def stats(self) -> dict:
+        return {
+            f"{kind}:{key}": {"acquired": bucket.acquired, "waited": round(bucket.waited, 2)}
+            for (kind, key), bucket in self._buckets.items()
+            if bucket is not None
+        }
+
+
+rate_limiter = RateLimiter()
@@ -8,7 +8,7 @@ from data.settings import Settings
 
 
 def async_retry(
-    retries: int = Settings().retry,
+    retries: int | None = None,
     delay: int = 3,
     to_raise: bool = True,
     exceptions: Tuple[Type[BaseException], ...] = (Exception,),
@@ -16,6 +16,8 @@ def async_retry(
     def decorator(func):
         @wraps(func)
         async def wrapper(self, *args, **kwargs):
+            # read per call, so edits of the retry setting apply to already decorated functions
+            max_attempts = retries if retries is not None else Settings().retry
             attempt = 0
             last_exc: BaseException | None = None
 
@@ -25,7 +27,7 @@ def async_retry(
 
             last_msg = None
 
-            while attempt < retries:
+            while attempt < max_attempts:
                 try:
                     return await func(self, *args, **kwargs)
 
@@ -35,10 +37,10 @@ def async_retry(
                 except exceptions as e:
                     last_exc = e
                     attempt += 1
-                    msg = f"{wallet_name} | {module} | {func.__name__} | Failed | attempt {attempt}/{retries}: {e}"
-                    last_msg = f"{func.__name__} | attempt {attempt}/{retries}: {e}"
+                    msg = f"{wallet_name} | {module} | {func.__name__} | Failed | attempt {attempt}/{max_attempts}: {e}"
+                    last_msg = f"{func.__name__} | attempt {attempt}/{max_attempts}: {e}"
                     logger.warning(msg)
-                    if attempt < retries:
+                    if attempt < max_attempts:
                         await asyncio.sleep(delay)
 
             if to_raise and last_exc is not None: